@@ -0,0 +1,118 @@
+"""
+Versioned cache helpers for rendered receipts and other rarely changing data,
+and ETags for the JSON lookups built from them.
+"""
+
+import hashlib
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+
+# Receipts for paid installments never change on their own, so rendered copies
+# can be kept for a long time; any edit moves the version and orphans them.
+RECEIPT_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+VERSIONED_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(namespace, ident=None):
+    if ident is None:
+        return f"application:version:{namespace}"
+    return f"application:version:{namespace}:{ident}"
+
+
+def get_version(namespace, ident=None):
+    """
+    Return the current version token for a namespace (optionally per object)
+    """
+    key = _version_key(namespace, ident)
+    version = cache.get(key)
+    if version is None:
+        # A fresh random token (rather than a counter restarting at 1) makes sure
+        # entries rendered before the version key was evicted are never reused.
+        version = uuid4().hex
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key) or version
+    return version
+
+
+def bump_version(namespace, ident=None):
+    """
+    Invalidate everything cached under a namespace (optionally per object)
+    """
+    cache.set(_version_key(namespace, ident), uuid4().hex, timeout=None)
+
+
+def bump_receipt_version(user_id=None):
+    """
+    Invalidate cached receipts for one student, or for everybody when no user is given
+    """
+    bump_version('receipt', user_id)
+
+
+def bump_batch_data_version():
+    """
+    Invalidate the franchise, batch and course fee lookups served with ETags
+    """
+    bump_version('batch_data')
+
+
+def cached_by_version(namespace, name, compute, timeout=VERSIONED_CACHE_TIMEOUT):
+    """
+    Return a value cached under the current version of a namespace, computing it on a miss
+    """
+    key = f"application:{name}:{get_version(namespace)}"
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+def receipt_cache_key(kind, user_id, *parts):
+    """
+    Build the cache key of a rendered receipt from the student's receipt version
+    """
+    versions = f"{get_version('receipt', user_id)}.{get_version('receipt')}"
+    # The parts can be long (e.g. lists of installment ids), so they are hashed
+    # to keep the key within memcached's 250 character limit
+    suffix = hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f"application:receipt:{kind}:{user_id}:{versions}:{suffix}"
+
+
+def cached_receipt(cache_key, template_name, get_context):
+    """
+    Serve a rendered receipt from the cache, rendering and storing it on a miss
+
+    ``get_context`` is only called on a miss, so cache hits never touch the fee tables.
+    """
+    html = cache.get(cache_key)
+    if html is None:
+        html = render_to_string(template_name, get_context())
+        cache.set(cache_key, html, RECEIPT_CACHE_TIMEOUT)
+    return HttpResponse(html)
+
+
+def versioned_json(request, get_data, namespace='batch_data'):
+    """
+    Serve a JSON lookup with an ETag derived from a version namespace
+
+    The ETag covers the namespace version, the user (responses are scoped to
+    what the user may see) and the full request path, so a matching
+    ``If-None-Match`` gets a 304 without ``get_data`` being called. Responses
+    are private and revalidated on every use.
+    """
+    token = f"{get_version(namespace)}:{request.user.pk}:{request.get_full_path()}"
+    etag = quote_etag(hashlib.md5(token.encode()).hexdigest())
+
+    client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+    if '*' in client_etags or etag in [tag.removeprefix('W/') for tag in client_etags]:
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse(get_data())
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,141 @@
+"""
+Overdue fee enforcement: unenroll students with long overdue fees and
+re-enroll them once they have paid, as configured by EnforcementPolicy.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .enrollment import ENROLLMENT_JOB_CHUNK_SIZE, active_enrollments, change_enrollments
+from .models import EnforcementAction, EnforcementPolicy, UserFranchise
+
+logger = logging.getLogger(__name__)
+
+
+def _policy_scope(policy, batch_policy_batch_ids):
+    """
+    Memberships governed by a policy; batches with a policy of their own are
+    left out of their franchise's policy
+    """
+    if policy.batch_id:
+        return Q(batch_id=policy.batch_id)
+    return Q(franchise_id=policy.franchise_id) & ~Q(batch_id__in=batch_policy_batch_ids)
+
+
+def unenroll_candidates(policy, scope, today):
+    """
+    Memberships in scope whose installments overdue for at least the policy's
+    number of days add up to more than its minimum amount, annotated with
+    ``overdue_amount``
+    """
+    cutoff = today - timedelta(days=policy.unenroll_after_days)
+    return UserFranchise.objects.filter(scope).annotate(
+        overdue_amount=Sum(
+            F('fee_management__installments__amount') - F('fee_management__installments__payed_amount'),
+            filter=Q(
+                fee_management__installments__status='overdue',
+                fee_management__installments__due_date__lte=cutoff,
+            ),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+    ).filter(
+        overdue_amount__gt=policy.min_overdue_amount
+    ).select_related('user', 'batch').order_by('id')
+
+
+def reenroll_candidates(scope):
+    """
+    Fully paid memberships in scope whose last enforcement action unenrolled them
+
+    Students unenrolled by staff rather than by a policy are left alone.
+    """
+    last_action = EnforcementAction.objects.filter(
+        user_franchise=OuterRef('pk'), error=''
+    ).order_by('-id').values('action')[:1]
+    return UserFranchise.objects.filter(
+        scope, fee_management__remaining_amount__lte=0
+    ).annotate(
+        last_enforcement_action=Subquery(last_action)
+    ).filter(
+        last_enforcement_action='unenroll'
+    ).select_related('user', 'batch').order_by('id')
+
+
+def _pending_changes(action, user_franchises):
+    """
+    Memberships whose enrollment status differs from the one ``action`` sets
+    """
+    pairs = [
+        (user_franchise.user_id, user_franchise.batch.course_id if user_franchise.batch else None)
+        for user_franchise in user_franchises
+    ]
+    enrolled = active_enrollments(pairs)
+    unenrolling = action == 'unenroll'
+    return [
+        user_franchise for user_franchise, pair in zip(user_franchises, pairs)
+        if pair[1] and (pair in enrolled) == unenrolling
+    ]
+
+
+def _apply(policy, action, user_franchises, chunk_size):
+    """
+    Change the enrollments chunk by chunk and record every change or failure
+    """
+    changed_count = failed_count = 0
+    for start in range(0, len(user_franchises), chunk_size):
+        chunk = user_franchises[start:start + chunk_size]
+        with transaction.atomic():
+            results = change_enrollments(action, chunk)
+            EnforcementAction.objects.bulk_create([
+                EnforcementAction(
+                    policy=policy,
+                    user_franchise=user_franchise,
+                    action=action,
+                    overdue_amount=getattr(user_franchise, 'overdue_amount', None) or 0,
+                    error=error,
+                )
+                for user_franchise, (changed, error) in zip(chunk, results)
+                if changed or error
+            ])
+        changed_count += sum(1 for changed, error in results if changed)
+        failed_count += sum(1 for changed, error in results if error)
+    return changed_count, failed_count
+
+
+def enforce_policies(today=None, chunk_size=ENROLLMENT_JOB_CHUNK_SIZE, dry_run=False):
+    """
+    Evaluate every active enforcement policy
+
+    Each policy finds the memberships to unenroll and to re-enroll with one
+    query apiece. With ``dry_run`` nothing is changed and the number of
+    memberships that would change is reported. Returns
+    ``(unenrolled, reenrolled, failed)``.
+    """
+    today = today or timezone.now().date()
+    policies = list(EnforcementPolicy.objects.filter(is_active=True).order_by('id'))
+    batch_policy_batch_ids = [policy.batch_id for policy in policies if policy.batch_id]
+
+    totals = {'unenroll': 0, 'enroll': 0}
+    failed = 0
+    for policy in policies:
+        scope = _policy_scope(policy, batch_policy_batch_ids)
+        work = []
+        if policy.unenroll_after_days is not None:
+            work.append(('unenroll', list(unenroll_candidates(policy, scope, today))))
+        if policy.reenroll_when_paid:
+            work.append(('enroll', list(reenroll_candidates(scope))))
+
+        for action, user_franchises in work:
+            if dry_run:
+                totals[action] += len(_pending_changes(action, user_franchises))
+                continue
+            changed, errors = _apply(policy, action, user_franchises, chunk_size)
+            totals[action] += changed
+            failed += errors
+            if errors:
+                logger.error("Enforcement policy %s could not %s %s students", policy.id, action, errors)
+    return totals['unenroll'], totals['enroll'], failed
@@ -0,0 +1,241 @@
+"""
+Bulk enrollment of students into franchise batches, and the background jobs
+that unenroll or re-enroll many students at once.
+"""
+
+import logging
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from common.djangoapps.student.models import CourseEnrollment
+
+from .fees import create_installment_schedules
+from .models import (
+    BatchFeeManagement,
+    EnrollmentJob,
+    EnrollmentJobItem,
+    InstallmentTemplate,
+    StudentFeeManagement,
+    UserFranchise,
+)
+from .search import refresh_search_index
+
+logger = logging.getLogger(__name__)
+
+ENROLLMENT_JOB_CHUNK_SIZE = 100
+
+
+def active_enrollments(pairs):
+    """
+    Resolve the enrollment status of many students with one CourseEnrollment query
+
+    ``pairs`` is an iterable of ``(user_id, course_id)``; pairs without a course
+    are ignored. Returns the set of pairs with an active enrollment, the batched
+    equivalent of calling ``CourseEnrollment.is_enrolled`` for each of them.
+    """
+    user_ids_by_course = defaultdict(set)
+    for user_id, course_id in pairs:
+        if course_id:
+            user_ids_by_course[course_id].add(user_id)
+    if not user_ids_by_course:
+        return set()
+
+    condition = Q()
+    for course_id, user_ids in user_ids_by_course.items():
+        condition |= Q(course_id=course_id, user_id__in=user_ids)
+    return set(
+        CourseEnrollment.objects.filter(condition, is_active=True).values_list('user_id', 'course_id')
+    )
+
+
+def enroll_users_in_batch(user_ids, franchise, batch, fee_management=None):
+    """
+    Enroll existing users into a batch with a fixed number of queries
+
+    Users already in the batch are skipped. Memberships, student fee records and
+    the installment schedules are written with ``bulk_create`` in one transaction.
+    Returns ``(enrolled_users, already_enrolled_users)``.
+    """
+    users = list(User.objects.filter(id__in=user_ids).order_by('id'))
+    existing_user_ids = set(
+        UserFranchise.objects.filter(
+            user__in=users, franchise=franchise, batch=batch
+        ).values_list('user_id', flat=True)
+    )
+    already_enrolled = [user for user in users if user.id in existing_user_ids]
+    new_users = [user for user in users if user.id not in existing_user_ids]
+    if not new_users:
+        return [], already_enrolled
+
+    if fee_management is None:
+        fee_management = BatchFeeManagement.objects.get(batch=batch)
+    templates = list(InstallmentTemplate.objects.filter(batch_fee_management=fee_management).order_by('id'))
+    new_user_ids = [user.id for user in new_users]
+
+    with transaction.atomic():
+        UserFranchise.objects.bulk_create([
+            UserFranchise(user=user, franchise=franchise, batch=batch, registration_number=user.username)
+            for user in new_users
+        ])
+        # Not every backend returns primary keys from bulk_create, so read the rows back
+        user_franchises = list(UserFranchise.objects.filter(
+            user_id__in=new_user_ids, franchise=franchise, batch=batch
+        ))
+
+        StudentFeeManagement.objects.bulk_create([
+            StudentFeeManagement(
+                user_franchise=user_franchise,
+                batch_fee_management=fee_management,
+                discount=fee_management.discount,
+                remaining_amount=batch.fees - fee_management.discount,
+            )
+            for user_franchise in user_franchises
+        ])
+        student_fees = {
+            student_fee.user_franchise_id: student_fee
+            for student_fee in StudentFeeManagement.objects.filter(user_franchise__in=user_franchises)
+        }
+
+        for user in new_users:
+            CourseEnrollment.enroll(user, batch.course_id)
+
+        registration_dates = {
+            user_id: created.date()
+            for user_id, created in CourseEnrollment.objects.filter(
+                user_id__in=new_user_ids, course_id=batch.course_id
+            ).values_list('user_id', 'created')
+        }
+
+        today = timezone.now().date()
+        create_installment_schedules(templates, [
+            (student_fees[user_franchise.id], registration_dates.get(user_franchise.user_id, today))
+            for user_franchise in user_franchises
+        ])
+
+        # bulk_create bypasses the signal handlers that keep the search index current
+        refresh_search_index(new_user_ids)
+
+    return new_users, already_enrolled
+
+
+# ==============================
+# BULK ENROLLMENT JOBS
+# ==============================
+
+def change_enrollments(action, user_franchises):
+    """
+    Unenroll (``action='unenroll'``) or enroll (``'enroll'``) the memberships in their batch courses
+
+    ``user_franchises`` need their user and batch loaded. The current status of
+    all of them is read with one query and only the memberships whose status
+    differs are changed, so repeating a call is harmless. Returns a
+    ``(changed, error)`` tuple per membership.
+    """
+    pairs = [
+        (user_franchise.user_id, user_franchise.batch.course_id if user_franchise.batch else None)
+        for user_franchise in user_franchises
+    ]
+    enrolled = active_enrollments(pairs)
+
+    results = []
+    for user_franchise, pair in zip(user_franchises, pairs):
+        course_id = pair[1]
+        if not course_id:
+            results.append((False, 'The membership has no batch course'))
+            continue
+        try:
+            # Each change gets its own savepoint, so a database error in one leaves
+            # the surrounding transaction usable for the rest of the chunk
+            if action == 'unenroll' and pair in enrolled:
+                with transaction.atomic():
+                    CourseEnrollment.unenroll(user_franchise.user, course_id)
+                results.append((True, ''))
+            elif action == 'enroll' and pair not in enrolled:
+                with transaction.atomic():
+                    CourseEnrollment.enroll(user_franchise.user, course_id)
+                results.append((True, ''))
+            else:
+                results.append((False, ''))
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error("Could not %s user %s in %s: %s", action, user_franchise.user_id, course_id, e)
+            results.append((False, str(e)))
+    return results
+
+
+def queue_enrollment_job(action, user_franchise_ids, created_by=None):
+    """
+    Create an EnrollmentJob for the given memberships and return it
+
+    The job only records the work; the process_enrollment_jobs worker changes
+    the enrollments.
+    """
+    user_franchise_ids = sorted(set(user_franchise_ids))
+    with transaction.atomic():
+        job = EnrollmentJob.objects.create(action=action, created_by=created_by, total=len(user_franchise_ids))
+        EnrollmentJobItem.objects.bulk_create([
+            EnrollmentJobItem(job=job, user_franchise_id=user_franchise_id)
+            for user_franchise_id in user_franchise_ids
+        ])
+    return job
+
+
+def process_enrollment_job_chunk(chunk_size=ENROLLMENT_JOB_CHUNK_SIZE):
+    """
+    Process the next chunk of the oldest unfinished enrollment job
+
+    Memberships are changed with change_enrollments(), so a chunk that is
+    retried after a crash does no harm. The job row is locked while its chunk
+    is processed, which lets several workers run side by side.
+    Returns the number of memberships processed, or None when no job is waiting.
+    """
+    with transaction.atomic():
+        job = (
+            EnrollmentJob.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['pending', 'running'])
+            .order_by('id')
+            .first()
+        )
+        if job is None:
+            return None
+
+        items = list(
+            job.items.filter(processed=False)
+            .select_related('user_franchise__user', 'user_franchise__batch')
+            .order_by('id')[:chunk_size]
+        )
+        results = change_enrollments(job.action, [item.user_franchise for item in items])
+        for item, (changed, error) in zip(items, results):
+            item.processed = True
+            item.error = error
+            if error:
+                job.failed += 1
+            elif changed:
+                job.changed += 1
+
+        EnrollmentJobItem.objects.bulk_update(items, ['processed', 'error'])
+        job.processed += len(items)
+        # Items go away with their memberships, so the counters may never meet:
+        # the job is done once no unprocessed item is left
+        if not job.items.filter(processed=False).exists():
+            job.status = 'done'
+            job.finished_at = timezone.now()
+        else:
+            job.status = 'running'
+        job.save(update_fields=['status', 'processed', 'changed', 'failed', 'finished_at'])
+    return len(items)
+
+
+def run_enrollment_jobs(chunk_size=ENROLLMENT_JOB_CHUNK_SIZE):
+    """
+    Process chunks until no enrollment job is left; returns the number of memberships processed
+    """
+    total = 0
+    while True:
+        processed = process_enrollment_job_chunk(chunk_size=chunk_size)
+        if processed is None:
+            return total
+        total += processed
@@ -0,0 +1,215 @@
+"""
+Set-based maintenance of installments and student fee records.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from itertools import accumulate
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from common.djangoapps.student.models import CourseEnrollment
+
+from .caching import bump_receipt_version
+from .models import BatchFeeManagement, Installment, InstallmentTemplate, Payment, StudentFeeManagement
+from .signals import installment_invalidation_suppressed
+
+logger = logging.getLogger(__name__)
+
+OVERDUE_SWEEP_CHUNK_SIZE = 1000
+
+
+def _update_status_in_chunks(queryset, status, chunk_size):
+    """
+    Set ``status`` on every row of ``queryset`` with one UPDATE per chunk of ids
+    """
+    updated = 0
+    while True:
+        # Updated rows drop out of the queryset, so the next chunk is always at the front
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return updated
+        updated += Installment.objects.filter(pk__in=ids).update(status=status)
+
+
+def mark_overdue_installments(today=None, chunk_size=OVERDUE_SWEEP_CHUNK_SIZE):
+    """
+    Move past-due pending installments to overdue
+
+    Installments rescheduled into the future are moved back to pending, so the
+    sweep is idempotent and can run as often as the scheduler likes.
+    Returns a ``(marked_overdue, restored_pending)`` tuple.
+    """
+    today = today or timezone.now().date()
+
+    marked_overdue = _update_status_in_chunks(
+        Installment.objects.filter(status='pending', due_date__lt=today), 'overdue', chunk_size
+    )
+    restored_pending = _update_status_in_chunks(
+        Installment.objects.filter(status='overdue', due_date__gte=today), 'pending', chunk_size
+    )
+
+    if marked_overdue or restored_pending:
+        # Queryset updates bypass the signal handlers, so drop every cached receipt
+        bump_receipt_version()
+
+    logger.info(
+        "Overdue sweep for %s: %d installments marked overdue, %d restored to pending",
+        today, marked_overdue, restored_pending
+    )
+    return marked_overdue, restored_pending
+
+
+# ==============================
+# INSTALLMENT SCHEDULES
+# ==============================
+
+def build_installment_schedules(templates, students, today=None):
+    """
+    Build (unsaved) installments for many students from the same templates
+
+    ``students`` is an iterable of ``(student_fee, registration_date)`` pairs. Each
+    installment falls due after the cumulative repayment periods of the templates
+    up to and including its own; the offsets are computed once for all students.
+    Installments already past due (backdated registrations) start out overdue,
+    as they would after the next overdue sweep.
+    """
+    today = today or timezone.now().date()
+    templates = list(templates)
+    offsets = [timedelta(days=days) for days in accumulate(t.repayment_period_days for t in templates)]
+    installments = []
+    for student_fee, registration_date in students:
+        for template, offset in zip(templates, offsets):
+            due_date = registration_date + offset
+            installments.append(Installment(
+                student_fee_management=student_fee,
+                due_date=due_date,
+                amount=template.amount,
+                repayment_period_days=template.repayment_period_days,
+                status='overdue' if due_date < today else 'pending',
+            ))
+    return installments
+
+
+def create_installment_schedules(templates, students, today=None):
+    """
+    Create the installment schedules of many students with a single bulk insert
+    """
+    return Installment.objects.bulk_create(build_installment_schedules(templates, students, today=today))
+
+
+def reschedule_installments(installments, registration_date):
+    """
+    Recompute the due dates of existing installments from their repayment periods
+
+    ``installments`` must be in schedule order; all rows are written with one bulk update.
+    """
+    installments = list(installments)
+    offsets = accumulate(installment.repayment_period_days for installment in installments)
+    for installment, days in zip(installments, offsets):
+        installment.due_date = registration_date + timedelta(days=days)
+    Installment.objects.bulk_update(installments, ['due_date'])
+    return installments
+
+
+# ==============================
+# BATCH RE-PLANNING
+# ==============================
+
+def _schedule(installments):
+    return [(i.due_date, i.amount, i.repayment_period_days) for i in installments]
+
+
+def plan_batch_replan(batch, fee_management=None, today=None):
+    """
+    Work out how re-applying the batch templates changes every student's schedule
+
+    Installments that are paid, partly paid or have a payment recorded are kept
+    and taken to cover the first templates; the other installments are replaced
+    by installments for the remaining templates, due after the cumulative
+    repayment periods from the registration date. Nothing is written.
+
+    Returns one dict per student with the ``kept``, ``removed`` and (unsaved)
+    ``added`` installments and whether the schedule ``changed``.
+    """
+    today = today or timezone.now().date()
+    if fee_management is None:
+        fee_management = BatchFeeManagement.objects.get(batch=batch)
+    templates = list(InstallmentTemplate.objects.filter(batch_fee_management=fee_management).order_by('id'))
+    offsets = [timedelta(days=days) for days in accumulate(t.repayment_period_days for t in templates)]
+
+    student_fees = list(
+        StudentFeeManagement.objects.filter(user_franchise__batch=batch)
+        .select_related('user_franchise__user')
+        .order_by('user_franchise__user__username')
+    )
+    installments = defaultdict(list)
+    for installment in Installment.objects.filter(
+        student_fee_management__in=student_fees
+    ).annotate(
+        has_payment=Exists(Payment.objects.filter(installment=OuterRef('pk')))
+    ).order_by('due_date', 'id'):
+        installments[installment.student_fee_management_id].append(installment)
+    registration_dates = {
+        user_id: created.date()
+        for user_id, created in CourseEnrollment.objects.filter(
+            user_id__in=[student_fee.user_franchise.user_id for student_fee in student_fees],
+            course_id=batch.course_id,
+        ).values_list('user_id', 'created')
+    }
+
+    plans = []
+    for student_fee in student_fees:
+        user = student_fee.user_franchise.user
+        registration_date = registration_dates.get(user.id, today)
+        kept, removed = [], []
+        for installment in installments[student_fee.id]:
+            settled = installment.status == 'paid' or installment.payed_amount > 0 or installment.has_payment
+            (kept if settled else removed).append(installment)
+
+        added = []
+        for template, offset in list(zip(templates, offsets))[len(kept):]:
+            due_date = registration_date + offset
+            added.append(Installment(
+                student_fee_management=student_fee,
+                due_date=due_date,
+                amount=template.amount,
+                repayment_period_days=template.repayment_period_days,
+                status='overdue' if due_date < today else 'pending',
+            ))
+
+        plans.append({
+            'student_fee': student_fee,
+            'user': user,
+            'kept': kept,
+            'removed': removed,
+            'added': added,
+            'changed': _schedule(removed) != _schedule(added),
+        })
+    return plans
+
+
+def apply_batch_replan(plans):
+    """
+    Write a re-plan: one bulk delete of the replaced installments and one bulk insert
+
+    Students whose schedule does not change are left alone. Returns the number
+    of students re-planned.
+    """
+    changed = [plan for plan in plans if plan['changed']]
+    if not changed:
+        return 0
+
+    with transaction.atomic(), installment_invalidation_suppressed():
+        Installment.objects.filter(
+            pk__in=[installment.pk for plan in changed for installment in plan['removed']]
+        ).delete()
+        Installment.objects.bulk_create([installment for plan in changed for installment in plan['added']])
+
+    # The per-row invalidation was suppressed above
+    bump_receipt_version()
+    logger.info("Re-planned the installments of %d students", len(changed))
+    return len(changed)
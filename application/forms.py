@@ -97,13 +97,35 @@ class FranchiseUserRegistrationForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Set a default username that will be overridden
-        if not self.instance.pk:
+        if not self.instance.pk and 'username' in self.fields:
             self.fields['username'].initial = 'temp_username'
 
         # Filter batches based on selected franchises dynamically
         # This will be handled by JavaScript in the template
 
 
+class StudentImportRowForm(FranchiseUserRegistrationForm):
+    """
+    Validates one row of a bulk student import with the registration form rules
+    """
+
+    class Meta(FranchiseUserRegistrationForm.Meta):
+        # Usernames are the registration numbers allocated on import
+        fields = ['email']
+
+    def clean_email(self):
+        # Uniqueness is checked for the whole file at once by the importer
+        return self.cleaned_data.get('email')
+
+
+class StudentImportForm(forms.Form):
+    csv_file = forms.FileField(
+        label='Students CSV',
+        help_text='Columns: full_name, email, phone, password, mailing_address',
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv'})
+    )
+
+
 class BatchForm(forms.ModelForm):
     discount = forms.DecimalField(
         max_digits=10,
@@ -309,9 +331,7 @@ class SpecialAccessUserRegistrationForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         # Store franchise-batch relationship for template
-        self.batch_franchise_map = {}
-        for batch in Batch.objects.all().select_related('franchise'):
-            self.batch_franchise_map[str(batch.id)] = str(batch.franchise.id)
+        self.batch_franchise_map = Batch.franchise_map()
 
     def save(self, commit=True):
         user = super().save(commit=False)
@@ -357,6 +377,4 @@ class EditSpecialAccessUserForm(forms.Form):
             self.fields['allowed_batches'].initial = self.special_access_user.allowed_batches.all()
 
         # Store franchise-batch relationship for template
-        self.batch_franchise_map = {}
-        for batch in Batch.objects.all().select_related('franchise'):
-            self.batch_franchise_map[str(batch.id)] = str(batch.franchise.id)
+        self.batch_franchise_map = Batch.franchise_map()
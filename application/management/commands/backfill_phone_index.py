@@ -0,0 +1,31 @@
+"""
+Fill the phone index from the phone numbers on the user profiles.
+
+Run once after installing the phone index migration; afterwards the index is
+kept up to date by the search index signals:
+
+    ./manage.py lms backfill_phone_index
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from application.search import SEARCH_INDEX_CHUNK_SIZE, rebuild_phone_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the PhoneIndex table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=SEARCH_INDEX_CHUNK_SIZE,
+            help='Number of users re-indexed per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be a positive integer')
+
+        rows = rebuild_phone_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"{rows} phone index rows written."))
@@ -0,0 +1,58 @@
+"""
+Apply the overdue fee enforcement policies.
+
+Run it nightly after mark_overdue_installments so that students are
+unenrolled and re-enrolled as their franchise or batch policy says:
+
+    ./manage.py lms enforce_fee_policies --dry-run
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from application.enforcement import enforce_policies
+from application.enrollment import ENROLLMENT_JOB_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Unenroll students with long overdue fees and re-enroll paid ones, per EnforcementPolicy."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            help='Treat this ISO date (YYYY-MM-DD) as today instead of the current date.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=ENROLLMENT_JOB_CHUNK_SIZE,
+            help='Number of enrollments changed per transaction.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many students would be unenrolled and re-enrolled.',
+        )
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError as error:
+                raise CommandError(f"Invalid --date: {options['date']}") from error
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be a positive integer')
+
+        unenrolled, reenrolled, failed = enforce_policies(
+            today=today, chunk_size=options['chunk_size'], dry_run=options['dry_run']
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"{unenrolled} students would be unenrolled and {reenrolled} re-enrolled."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{unenrolled} students unenrolled, {reenrolled} re-enrolled, {failed} failed."
+            ))
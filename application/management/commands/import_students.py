@@ -0,0 +1,44 @@
+"""
+Register and enroll the students listed in a CSV file into a batch.
+
+The CSV needs the columns full_name, email, phone, password and mailing_address:
+
+    ./manage.py lms import_students students.csv --batch 12
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from application.models import Batch, BatchFeeManagement
+from application.registration import import_students, parse_student_csv
+
+
+class Command(BaseCommand):
+    help = "Bulk-register the students of a CSV file into a batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='Path of the CSV file to import.')
+        parser.add_argument('--batch', type=int, required=True, help='Id of the batch to enroll the students in.')
+
+    def handle(self, *args, **options):
+        try:
+            batch = Batch.objects.select_related('franchise').get(pk=options['batch'])
+        except Batch.DoesNotExist as error:
+            raise CommandError(f"Batch {options['batch']} does not exist") from error
+        if not BatchFeeManagement.objects.filter(batch=batch).exists():
+            raise CommandError(f"Batch {batch.batch_no} has no fees management set up")
+
+        try:
+            with open(options['csv_path'], encoding='utf-8-sig', newline='') as csv_file:
+                rows = parse_student_csv(csv_file)
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error)) from error
+
+        created_users, errors = import_students(rows, batch.franchise, batch)
+        if errors:
+            for row_number, messages in sorted(errors.items()):
+                self.stderr.write(f"Row {row_number}: {'; '.join(messages)}")
+            raise CommandError(f"{len(errors)} invalid rows, nothing was imported")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(created_users)} students registered in {batch.batch_no}."
+        ))
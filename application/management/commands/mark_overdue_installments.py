@@ -0,0 +1,47 @@
+"""
+Move past-due pending installments to the overdue status.
+
+Meant to run daily from cron or any other scheduler:
+
+    ./manage.py lms mark_overdue_installments
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from application.fees import OVERDUE_SWEEP_CHUNK_SIZE, mark_overdue_installments
+
+
+class Command(BaseCommand):
+    help = "Mark past-due pending installments as overdue (and rescheduled ones as pending again)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=OVERDUE_SWEEP_CHUNK_SIZE,
+            help='Number of installments updated per UPDATE statement.',
+        )
+        parser.add_argument(
+            '--date',
+            help='Treat this ISO date (YYYY-MM-DD) as today instead of the current date.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be a positive integer')
+
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError as error:
+                raise CommandError(f"Invalid --date: {options['date']}") from error
+
+        marked_overdue, restored_pending = mark_overdue_installments(
+            today=today, chunk_size=options['chunk_size']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{marked_overdue} installments marked overdue, {restored_pending} restored to pending."
+        ))
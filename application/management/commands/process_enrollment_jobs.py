@@ -0,0 +1,46 @@
+"""
+Run the queued bulk unenroll and re-enroll jobs.
+
+Run it from cron, or keep it running as a worker with --interval:
+
+    ./manage.py lms process_enrollment_jobs --interval 5
+
+Jobs interrupted by a crash or restart are resumed from their first
+unprocessed membership.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from application.enrollment import ENROLLMENT_JOB_CHUNK_SIZE, run_enrollment_jobs
+
+
+class Command(BaseCommand):
+    help = "Process the queued bulk enrollment jobs in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=ENROLLMENT_JOB_CHUNK_SIZE,
+            help='Number of memberships processed per transaction.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep polling for jobs every INTERVAL seconds instead of exiting once none is left.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be a positive integer')
+
+        while True:
+            processed = run_enrollment_jobs(chunk_size=options['chunk_size'])
+            if processed or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(f"{processed} memberships processed."))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+"""
+Rebuild the student search index from the users, profiles and memberships.
+
+Run once after installing the search index migration, and whenever the index
+is suspected to be out of date:
+
+    ./manage.py lms rebuild_student_search_index
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from application.search import SEARCH_INDEX_CHUNK_SIZE, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the StudentSearchIndex table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=SEARCH_INDEX_CHUNK_SIZE,
+            help='Number of users re-indexed per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be a positive integer')
+
+        rows = rebuild_search_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"{rows} search index rows written."))
@@ -0,0 +1,61 @@
+"""
+Queue reminder emails for upcoming and overdue installments.
+
+Installments already reminded are skipped, so it is safe to run nightly after
+mark_overdue_installments:
+
+    ./manage.py lms send_fee_reminders --deliver --rate-limit 5
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from application.models import Batch, Franchise
+from application.reminders import queue_fee_reminders
+from application.utils import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Queue one fee reminder email per student with upcoming or overdue installments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--franchise', type=int, action='append', help='Only remind students of this franchise id.')
+        parser.add_argument('--batch', type=int, action='append', help='Only remind students of this batch id.')
+        parser.add_argument(
+            '--date',
+            help='Treat this ISO date (YYYY-MM-DD) as today instead of the current date.',
+        )
+        parser.add_argument(
+            '--deliver',
+            action='store_true',
+            help='Drain the outbox after queuing instead of leaving it to send_queued_emails.',
+        )
+        parser.add_argument(
+            '--rate-limit',
+            type=float,
+            default=None,
+            help='With --deliver, send at most this many emails per second.',
+        )
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = date.fromisoformat(options['date'])
+            except ValueError as error:
+                raise CommandError(f"Invalid --date: {options['date']}") from error
+
+        franchises = Franchise.objects.filter(pk__in=options['franchise']) if options['franchise'] else None
+        batches = Batch.objects.filter(pk__in=options['batch']) if options['batch'] else None
+
+        emails, installments = queue_fee_reminders(franchises=franchises, batches=batches, today=today)
+        self.stdout.write(self.style.SUCCESS(
+            f"{emails} reminder emails queued for {installments} installments."
+        ))
+
+        if options['deliver']:
+            sent, deferred, failed = drain_outbox(rate_limit=options['rate_limit'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{sent} emails sent, {deferred} deferred for retry, {failed} given up."
+            ))
@@ -0,0 +1,66 @@
+"""
+Deliver the emails waiting in the outbox.
+
+Run it from cron, or keep it running as a worker with --interval:
+
+    ./manage.py lms send_queued_emails --interval 10
+
+Set EMAIL_BACKEND to django.core.mail.backends.console.EmailBackend (or the
+filebased backend) to try it locally without a mail server.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from application.utils import EMAIL_MAX_ATTEMPTS, EMAIL_OUTBOX_BATCH_SIZE, drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Send the queued outbox emails in batches over a reused mail connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EMAIL_OUTBOX_BATCH_SIZE,
+            help='Number of emails sent per mail connection.',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=EMAIL_MAX_ATTEMPTS,
+            help='Number of attempts before an email is marked failed.',
+        )
+        parser.add_argument(
+            '--rate-limit',
+            type=float,
+            default=None,
+            help='Send at most this many emails per second (default: APPLICATION_EMAIL_RATE_LIMIT).',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep polling the outbox every INTERVAL seconds instead of exiting once it is drained.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be a positive integer')
+        if options['max_attempts'] <= 0:
+            raise CommandError('--max-attempts must be a positive integer')
+
+        while True:
+            sent, deferred, failed = drain_outbox(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+                rate_limit=options['rate_limit'],
+            )
+            if sent or deferred or failed or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{sent} emails sent, {deferred} deferred for retry, {failed} given up."
+                ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
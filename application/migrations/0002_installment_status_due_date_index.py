@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:34
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_existing_overdue(apps, schema_editor):
+    # Reports now read the overdue status directly, so bring existing rows up to date once
+    Installment = apps.get_model('application', 'Installment')
+    Installment.objects.filter(status='pending', due_date__lt=timezone.now().date()).update(status='overdue')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='installment',
+            index=models.Index(fields=['status', 'due_date'], name='application_status_c97e22_idx'),
+        ),
+        migrations.RunPython(mark_existing_overdue, migrations.RunPython.noop),
+    ]
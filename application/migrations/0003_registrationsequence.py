@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0002_installment_status_due_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationSequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_number', models.PositiveIntegerField()),
+                ('last_number', models.PositiveIntegerField(default=0)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registration_sequences', to='application.batch')),
+                ('franchise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registration_sequences', to='application.franchise')),
+            ],
+            options={
+                'unique_together': {('franchise', 'batch')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0004_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeeReminder',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('upcoming', 'Upcoming'), ('overdue', 'Overdue')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('installment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='application.installment')),
+            ],
+            options={
+                'unique_together': {('installment', 'kind')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('application', '0005_feereminder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSearchIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=255)),
+                ('last_name', models.CharField(db_index=True, max_length=150)),
+                ('email', models.CharField(db_index=True, max_length=254)),
+                ('username', models.CharField(db_index=True, max_length=150)),
+                ('phone', models.CharField(blank=True, db_index=True, max_length=20)),
+                ('registration_number', models.CharField(blank=True, db_index=True, max_length=20)),
+                ('batch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='application.batch')),
+                ('franchise', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='application.franchise')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_index_entries', to=settings.AUTH_USER_MODEL)),
+                ('user_franchise', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_index_entry', to='application.userfranchise')),
+            ],
+        ),
+    ]
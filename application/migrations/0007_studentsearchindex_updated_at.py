@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0006_studentsearchindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentsearchindex',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
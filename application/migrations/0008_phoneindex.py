@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('application', '0007_studentsearchindex_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhoneIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digits', models.CharField(db_index=True, max_length=20)),
+                ('is_full', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='phone_index_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'digits')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('application', '0008_phoneindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('unenroll', 'Unenroll'), ('enroll', 'Re-enroll')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done')], default='pending', max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('changed', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EnrollmentJobItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('processed', models.BooleanField(default=False)),
+                ('error', models.TextField(blank=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='application.enrollmentjob')),
+                ('user_franchise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='application.userfranchise')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', 'processed'], name='application_job_id_b1aec2_idx')],
+                'unique_together': {('job', 'user_franchise')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='enrollmentjob',
+            index=models.Index(fields=['status', 'id'], name='application_status_5ac249_idx'),
+        ),
+    ]
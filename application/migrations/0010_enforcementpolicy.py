@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 13:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0009_enrollmentjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnforcementPolicy',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unenroll_after_days', models.PositiveIntegerField(blank=True, help_text='Leave empty to never unenroll', null=True)),
+                ('min_overdue_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('reenroll_when_paid', models.BooleanField(default=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('batch', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='enforcement_policy', to='application.batch')),
+                ('franchise', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='enforcement_policies', to='application.franchise')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EnforcementAction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('unenroll', 'Unenroll'), ('enroll', 'Re-enroll')], max_length=10)),
+                ('overdue_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('policy', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='actions', to='application.enforcementpolicy')),
+                ('user_franchise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='enforcement_actions', to='application.userfranchise')),
+            ],
+        ),
+    ]
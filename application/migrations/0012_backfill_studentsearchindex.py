@@ -0,0 +1,59 @@
+from django.db import migrations
+
+from application.search import SEARCH_INDEX_CHUNK_SIZE, digits_only, normalise_text
+
+
+def backfill_student_search_index(apps, schema_editor):
+    # Search reads only the index, so fill it for the users that existed before it did
+    User = apps.get_model('auth', 'User')
+    UserProfile = apps.get_model('student', 'UserProfile')
+    UserFranchise = apps.get_model('application', 'UserFranchise')
+    StudentSearchIndex = apps.get_model('application', 'StudentSearchIndex')
+
+    last_id = 0
+    while True:
+        users = list(
+            User.objects.filter(id__gt=last_id).order_by('id')
+            .only('id', 'username', 'email', 'first_name', 'last_name')[:SEARCH_INDEX_CHUNK_SIZE]
+        )
+        if not users:
+            break
+        user_ids = [user.id for user in users]
+        phones = dict(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'phone_number'))
+        memberships = {}
+        for user_franchise in UserFranchise.objects.filter(user_id__in=user_ids).order_by('id'):
+            memberships.setdefault(user_franchise.user_id, []).append(user_franchise)
+
+        rows = []
+        for user in users:
+            fields = {
+                'user_id': user.id,
+                'name': normalise_text(f'{user.first_name} {user.last_name}'),
+                'last_name': normalise_text(user.last_name),
+                'email': normalise_text(user.email),
+                'username': normalise_text(user.username),
+                'phone': digits_only(phones.get(user.id))[:20],
+            }
+            for user_franchise in memberships.get(user.id) or [None]:
+                rows.append(StudentSearchIndex(
+                    user_franchise_id=user_franchise.id if user_franchise else None,
+                    franchise_id=user_franchise.franchise_id if user_franchise else None,
+                    batch_id=user_franchise.batch_id if user_franchise else None,
+                    registration_number=normalise_text(user_franchise.registration_number) if user_franchise else '',
+                    **fields
+                ))
+        StudentSearchIndex.objects.filter(user_id__in=user_ids).delete()
+        StudentSearchIndex.objects.bulk_create(rows)
+        last_id = user_ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0001_initial'),
+        ('application', '0011_outgoingemail_sending_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_student_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+from django.db import migrations
+
+from application.search import SEARCH_INDEX_CHUNK_SIZE, phone_index_keys
+
+
+def backfill_phone_index(apps, schema_editor):
+    # Phone searches read only the index, so fill it for the profiles that existed before it did
+    UserProfile = apps.get_model('student', 'UserProfile')
+    PhoneIndex = apps.get_model('application', 'PhoneIndex')
+
+    last_id = 0
+    while True:
+        profiles = list(
+            UserProfile.objects.filter(user_id__gt=last_id).order_by('user_id')
+            .values_list('user_id', 'phone_number')[:SEARCH_INDEX_CHUNK_SIZE]
+        )
+        if not profiles:
+            break
+        user_ids = [user_id for user_id, _ in profiles]
+        PhoneIndex.objects.filter(user_id__in=user_ids).delete()
+        PhoneIndex.objects.bulk_create([
+            PhoneIndex(user_id=user_id, digits=digits, is_full=(position == 0))
+            for user_id, phone in profiles
+            for position, digits in enumerate(phone_index_keys(phone))
+        ])
+        last_id = user_ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student', '0001_initial'),
+        ('application', '0012_backfill_studentsearchindex'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_phone_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:35
+
+from django.db import migrations, models
+
+
+def fit_existing_policies(apps, schema_editor):
+    # Bring existing policies within the new constraints the way enforcement read them:
+    # policies without a scope never applied, a batch took precedence over a franchise,
+    # and of several franchise policies the newest active one is kept
+    EnforcementPolicy = apps.get_model('application', 'EnforcementPolicy')
+    EnforcementPolicy.objects.filter(franchise__isnull=True, batch__isnull=True).delete()
+    EnforcementPolicy.objects.filter(franchise__isnull=False, batch__isnull=False).update(franchise=None)
+    kept = set()
+    for policy in EnforcementPolicy.objects.filter(franchise__isnull=False).order_by('-is_active', '-id'):
+        if policy.franchise_id in kept:
+            policy.delete()
+        kept.add(policy.franchise_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0013_backfill_phoneindex'),
+    ]
+
+    operations = [
+        migrations.RunPython(fit_existing_policies, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='enforcementpolicy',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('batch__isnull', True), ('franchise__isnull', False)), models.Q(('batch__isnull', False), ('franchise__isnull', True)), _connector='OR'), name='enforcementpolicy_franchise_xor_batch'),
+        ),
+        migrations.AddConstraint(
+            model_name='enforcementpolicy',
+            constraint=models.UniqueConstraint(fields=('franchise',), name='enforcementpolicy_unique_franchise'),
+        ),
+    ]
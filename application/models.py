@@ -1,8 +1,14 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import User
 from django.utils import timezone
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
 
+from .caching import bump_receipt_version, cached_by_version
+
 
 class CourseFee(models.Model):
     course = models.OneToOneField(CourseOverview, on_delete=models.CASCADE, related_name='fee')
@@ -36,24 +42,7 @@ class UserFranchise(models.Model):  #student details
         if not self.franchise or not self.batch:
             return None
 
-        # Franchise number: franchise.id zero-padded to 3 digits
-        franchise_num = f"{self.franchise.id:03d}"
-
-        # Batch number: order of batch within franchise, zero-padded to 3 digits
-        batch_order = Batch.objects.filter(
-            franchise=self.franchise,
-            id__lte=self.batch.id
-        ).count()
-        batch_num = f"{batch_order:03d}"
-
-        # Student number: count of students in this franchise and batch + 1, zero-padded to 4 digits
-        student_count = UserFranchise.objects.filter(
-            franchise=self.franchise,
-            batch=self.batch
-        ).exclude(registration_number__isnull=True).count() + 1
-        student_num = f"{student_count:04d}"
-
-        return f"AT-{franchise_num}-{batch_num}-{student_num}"
+        return RegistrationSequence.allocate(self.franchise, self.batch)[0]
 
     def save(self, *args, **kwargs):
         if not self.registration_number:
@@ -72,10 +61,97 @@ class Batch(models.Model):
     course = models.ForeignKey(CourseOverview, on_delete=models.CASCADE, related_name='batches')
     franchise = models.ForeignKey(Franchise, on_delete=models.CASCADE, related_name='batches')
 
+    @classmethod
+    def franchise_map(cls):
+        """
+        Map of batch id to franchise id (both as strings) for every batch
+
+        Cached under the batch data version, which the signals bump whenever a
+        batch is saved or deleted.
+        """
+        return cached_by_version('batch_data', 'batch_franchise_map', lambda: {
+            str(batch_id): str(franchise_id)
+            for batch_id, franchise_id in cls.objects.values_list('id', 'franchise_id')
+        })
+
+    def save(self, *args, **kwargs):
+        previous_fees = None
+        if self.pk:
+            previous_fees = Batch.objects.filter(pk=self.pk).values_list('fees', flat=True).first()
+        super().save(*args, **kwargs)
+        if previous_fees is not None and previous_fees != self.fees:
+            BatchFeeManagement.objects.filter(batch=self).update(remaining_amount=Value(self.fees) - F('discount'))
+            StudentFeeManagement.refresh_remaining_amounts(self)
+
     def __str__(self):
         return f"Batch {self.batch_no} - {self.course.display_name if self.course else 'No Course'}"
 
 
+class RegistrationSequence(models.Model):
+    """
+    Per franchise and batch counter handing out student registration numbers
+
+    Registration numbers look like ``AT-FFF-BBB-SSSS``: franchise id, position of
+    the batch within the franchise and the student's sequence number in the batch.
+    """
+    franchise = models.ForeignKey(Franchise, on_delete=models.CASCADE, related_name='registration_sequences')
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='registration_sequences')
+    batch_number = models.PositiveIntegerField()
+    last_number = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('franchise', 'batch')
+
+    @classmethod
+    def _seed(cls, franchise, batch):
+        # Batch number: order of batch within franchise
+        batch_number = Batch.objects.filter(franchise=franchise, id__lte=batch.id).count()
+
+        # Continue after the students registered before the sequence existed
+        existing_numbers = UserFranchise.objects.filter(
+            franchise=franchise,
+            batch=batch
+        ).exclude(registration_number__isnull=True).values_list('registration_number', flat=True)
+        last_number = len(existing_numbers)
+        prefix = f"AT-{franchise.id:03d}-{batch_number:03d}-"
+        for number in existing_numbers:
+            if number.startswith(prefix) and number[len(prefix):].isdigit():
+                last_number = max(last_number, int(number[len(prefix):]))
+
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    franchise=franchise, batch=batch, batch_number=batch_number, last_number=last_number
+                )
+        except IntegrityError:
+            pass  # Another registration created the row first
+
+    @classmethod
+    def allocate(cls, franchise, batch, count=1):
+        """
+        Reserve ``count`` consecutive registration numbers for the batch and return them
+
+        The sequence row is locked for the duration of the transaction, so concurrent
+        registrations (and bulk imports) never receive the same number.
+        """
+        with transaction.atomic():
+            try:
+                sequence = cls.objects.select_for_update().get(franchise=franchise, batch=batch)
+            except cls.DoesNotExist:
+                cls._seed(franchise, batch)
+                sequence = cls.objects.select_for_update().get(franchise=franchise, batch=batch)
+
+            first = sequence.last_number + 1
+            sequence.last_number += count
+            sequence.save(update_fields=['last_number'])
+
+        prefix = f"AT-{franchise.id:03d}-{sequence.batch_number:03d}-"
+        return [f"{prefix}{number:04d}" for number in range(first, first + count)]
+
+    def __str__(self):
+        return f"Registration sequence for {self.batch}: {self.last_number}"
+
+
 class BatchFeeManagement(models.Model):
     batch = models.OneToOneField(Batch, on_delete=models.CASCADE, related_name='fee_management')
     discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
@@ -84,8 +160,13 @@ class BatchFeeManagement(models.Model):
     repayment_period_days = models.PositiveIntegerField(default=30)
 
     def save(self, *args, **kwargs):
+        previous_discount = None
+        if self.pk:
+            previous_discount = BatchFeeManagement.objects.filter(pk=self.pk).values_list('discount', flat=True).first()
         self.remaining_amount = self.batch.fees - self.discount
         super().save(*args, **kwargs)
+        if previous_discount is not None and previous_discount != self.discount:
+            StudentFeeManagement.refresh_remaining_amounts(self.batch, discount_delta=self.discount - previous_discount)
 
     def __str__(self):
         return f"Fee Management for {self.batch}"
@@ -98,9 +179,44 @@ class StudentFeeManagement(models.Model):
     remaining_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
     def save(self, *args, **kwargs):
-        self.remaining_amount = self.batch_fee_management.batch.fees - self.discount
+        paid = 0
+        if self.pk:
+            paid = self.installments.aggregate(total=Sum('payed_amount'))['total'] or 0
+        self.remaining_amount = self.batch_fee_management.batch.fees - self.discount - paid
         super().save(*args, **kwargs)
 
+    @classmethod
+    def refresh_remaining_amounts(cls, batch, discount_delta=0):
+        """
+        Recompute remaining_amount (fees - discount - paid) for every student of a batch
+
+        Runs as a single UPDATE. A student's discount is the batch discount plus any
+        additional discount of their own, so a batch discount change shifts every
+        student's discount by ``discount_delta`` in the same statement, never below
+        zero. Returns the number of rows updated.
+        """
+        paid = Installment.objects.filter(
+            student_fee_management=OuterRef('pk')
+        ).values('student_fee_management').annotate(total=Sum('payed_amount')).values('total')
+        discount = F('discount')
+        if discount_delta:
+            discount = Greatest(
+                F('discount') + Value(discount_delta),
+                Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+
+        # remaining_amount is assigned first: MySQL evaluates SET clauses left to
+        # right, so it must still see the old discount like the other backends do
+        updates = {'remaining_amount': Value(batch.fees) - discount - Coalesce(Subquery(paid), Value(Decimal('0')))}
+        if discount_delta:
+            updates['discount'] = discount
+        updated = cls.objects.filter(batch_fee_management__batch=batch).update(**updates)
+
+        # Queryset updates bypass the signal handlers
+        bump_receipt_version()
+        return updated
+
     def __str__(self):
         return f"Fee Management for {self.user_franchise.user.username}"
 
@@ -119,6 +235,11 @@ class Installment(models.Model):
     payment_date = models.DateField(blank=True, null=True)
     repayment_period_days = models.PositiveIntegerField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'due_date']),
+        ]
+
     def __str__(self):
         return f"Installment {self.id} for {self.student_fee_management} - {self.status}"
 
@@ -173,3 +294,211 @@ class SpecialAccessUser(models.Model):
 
     def __str__(self):
         return f"Special Access for {self.user.username} - {self.get_permission_type_display()}"
+
+
+class OutgoingEmail(models.Model):
+    """
+    Email waiting in the outbox until the send_queued_emails worker delivers it
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.TextField(help_text='Comma separated recipient addresses')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    @property
+    def recipients(self):
+        return [address.strip() for address in self.to.split(',') if address.strip()]
+
+    def __str__(self):
+        return f"Email to {self.to}: {self.subject} - {self.status}"
+
+
+class FeeReminder(models.Model):
+    """
+    Record of a reminder queued for an installment, so reminder runs are incremental
+    """
+    KIND_CHOICES = [
+        ('upcoming', 'Upcoming'),
+        ('overdue', 'Overdue'),
+    ]
+    installment = models.ForeignKey(Installment, on_delete=models.CASCADE, related_name='reminders')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('installment', 'kind')
+
+    def __str__(self):
+        return f"{self.get_kind_display()} reminder for Installment {self.installment_id}"
+
+
+class StudentSearchIndex(models.Model):
+    """
+    Normalised copy of the searchable student fields, kept in sync by signals
+
+    There is one row per membership (UserFranchise) of a user, or a single row
+    without membership for users that have none. Text is lower-cased and phone
+    numbers keep only their digits, so every lookup is an indexed prefix match.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_index_entries')
+    user_franchise = models.OneToOneField(
+        UserFranchise, on_delete=models.CASCADE, null=True, blank=True, related_name='search_index_entry'
+    )
+    franchise = models.ForeignKey(Franchise, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    batch = models.ForeignKey(Batch, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    name = models.CharField(max_length=255, db_index=True)
+    last_name = models.CharField(max_length=150, db_index=True)
+    email = models.CharField(max_length=254, db_index=True)
+    username = models.CharField(max_length=150, db_index=True)
+    phone = models.CharField(max_length=20, blank=True, db_index=True)
+    registration_number = models.CharField(max_length=20, blank=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"Search entry for {self.username}"
+
+
+class PhoneIndex(models.Model):
+    """
+    Normalised phone number digits of a user, and their suffixes, for indexed lookups
+
+    Each user has a full-number row (used for prefix matches) plus one row for
+    every suffix of at least PHONE_SUFFIX_MIN_DIGITS digits, so a number typed
+    without its country code or trunk prefix is an equality match.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='phone_index_entries')
+    digits = models.CharField(max_length=20, db_index=True)
+    is_full = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('user', 'digits')
+
+    def __str__(self):
+        return f"Phone {self.digits} of user {self.user_id}"
+
+
+class EnrollmentJob(models.Model):
+    """
+    Bulk unenroll or re-enroll request, processed in chunks by the process_enrollment_jobs worker
+    """
+    ACTION_CHOICES = [
+        ('unenroll', 'Unenroll'),
+        ('enroll', 'Re-enroll'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+    ]
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} job {self.id} - {self.status}"
+
+
+class EnrollmentJobItem(models.Model):
+    """
+    One membership of an EnrollmentJob; processed items are skipped when a job is resumed
+    """
+    job = models.ForeignKey(EnrollmentJob, on_delete=models.CASCADE, related_name='items')
+    user_franchise = models.ForeignKey(UserFranchise, on_delete=models.CASCADE, related_name='+')
+    processed = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ('job', 'user_franchise')
+        indexes = [
+            models.Index(fields=['job', 'processed']),
+        ]
+
+    def __str__(self):
+        return f"Item {self.user_franchise_id} of enrollment job {self.job_id}"
+
+
+class EnforcementPolicy(models.Model):
+    """
+    Fee enforcement rules of a franchise or a batch, applied by the enforce_fee_policies command
+
+    Students are unenrolled once installments overdue for ``unenroll_after_days``
+    days add up to more than ``min_overdue_amount``, and re-enrolled when
+    ``reenroll_when_paid`` is set and they have paid in full. A policy belongs
+    to either a franchise or a batch, and each has at most one; a batch policy
+    takes precedence over the policy of its franchise.
+    """
+    franchise = models.ForeignKey(
+        Franchise, on_delete=models.CASCADE, null=True, blank=True, related_name='enforcement_policies'
+    )
+    batch = models.OneToOneField(
+        Batch, on_delete=models.CASCADE, null=True, blank=True, related_name='enforcement_policy'
+    )
+    unenroll_after_days = models.PositiveIntegerField(
+        null=True, blank=True, help_text='Leave empty to never unenroll'
+    )
+    min_overdue_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    reenroll_when_paid = models.BooleanField(default=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=Q(franchise__isnull=False, batch__isnull=True) | Q(franchise__isnull=True, batch__isnull=False),
+                name='enforcementpolicy_franchise_xor_batch',
+            ),
+            # Batch policies leave franchise empty, and empty values never collide,
+            # so this only limits franchise policies (MySQL has no partial indexes)
+            models.UniqueConstraint(fields=['franchise'], name='enforcementpolicy_unique_franchise'),
+        ]
+
+    def __str__(self):
+        scope = f"Batch {self.batch}" if self.batch_id else f"Franchise {self.franchise}"
+        return f"Enforcement policy for {scope}"
+
+
+class EnforcementAction(models.Model):
+    """
+    Audit trail of the enrollment changes made by enforcement policies
+    """
+    ACTION_CHOICES = [
+        ('unenroll', 'Unenroll'),
+        ('enroll', 'Re-enroll'),
+    ]
+    policy = models.ForeignKey(EnforcementPolicy, on_delete=models.SET_NULL, null=True, related_name='actions')
+    user_franchise = models.ForeignKey(UserFranchise, on_delete=models.CASCADE, related_name='enforcement_actions')
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    overdue_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_action_display()} of {self.user_franchise_id} by policy {self.policy_id}"
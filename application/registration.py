@@ -0,0 +1,182 @@
+"""
+Bulk registration of new students from CSV files.
+"""
+
+import csv
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from common.djangoapps.student.models import UserProfile
+
+from .enrollment import enroll_users_in_batch
+from .forms import StudentImportRowForm
+from .models import BatchFeeManagement, RegistrationSequence
+from .utils import queue_registration_emails
+
+STUDENT_CSV_COLUMNS = ['full_name', 'email', 'phone', 'password', 'mailing_address']
+# Upper bound on the password hashing processes of each web or command process
+MAX_HASH_WORKERS = 4
+
+
+def parse_student_csv(csv_file):
+    """
+    Read the rows of an uploaded (binary) or opened (text) student CSV file
+    """
+    if isinstance(csv_file, (io.TextIOBase, io.StringIO)):
+        text = csv_file
+    else:
+        text = io.TextIOWrapper(csv_file, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    missing = [column for column in STUDENT_CSV_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+    return [
+        {column: (row.get(column) or '').strip() for column in STUDENT_CSV_COLUMNS}
+        for row in reader
+    ]
+
+
+def validate_student_rows(rows):
+    """
+    Validate CSV rows with the registration form rules
+
+    Returns ``(cleaned_rows, errors)`` where ``errors`` maps 1-based data row numbers
+    to a list of messages. Email uniqueness is checked for all rows with one query.
+    """
+    cleaned_rows = []
+    errors = {}
+    seen_emails = {}
+    for row_number, row in enumerate(rows, start=1):
+        form = StudentImportRowForm(data=row)
+        if not form.is_valid():
+            errors[row_number] = [
+                f"{field}: {message}" for field, messages in form.errors.items() for message in messages
+            ]
+            continue
+        email = form.cleaned_data['email']
+        if email.lower() in seen_emails:
+            errors[row_number] = [f"email: Duplicate of row {seen_emails[email.lower()]}"]
+            continue
+        seen_emails[email.lower()] = row_number
+        cleaned_rows.append((row_number, form.cleaned_data))
+
+    existing_emails = set(
+        email.lower() for email in User.objects.filter(
+            email__in=[data['email'] for _, data in cleaned_rows]
+        ).values_list('email', flat=True)
+    )
+    for row_number, data in cleaned_rows:
+        if data['email'].lower() in existing_emails:
+            errors[row_number] = ["email: Email already exists"]
+
+    cleaned_rows = [(row_number, data) for row_number, data in cleaned_rows if row_number not in errors]
+    return cleaned_rows, errors
+
+
+def _init_hash_worker():
+    # Workers are spawned rather than forked, so they set up the project themselves
+    import django  # pylint: disable=import-outside-toplevel
+    from django.apps import apps  # pylint: disable=import-outside-toplevel
+    if not apps.ready:
+        django.setup()
+
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+
+def _hash_worker_count():
+    workers = getattr(settings, 'APPLICATION_IMPORT_HASH_WORKERS', None)
+    if workers is None:
+        workers = min(MAX_HASH_WORKERS, os.cpu_count() or 1)
+    return workers
+
+
+def _get_hash_pool():
+    """
+    Return this process's password hashing pool, starting it on first use
+
+    The pool is shared by every import the process runs, so requests never
+    start processes of their own. Workers are spawned instead of forked from
+    the (possibly multi-threaded) web worker.
+    """
+    global _hash_pool  # pylint: disable=global-statement
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=_hash_worker_count(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_hash_worker,
+            )
+        return _hash_pool
+
+
+def hash_passwords(raw_passwords):
+    """
+    Hash many passwords, spreading the key stretching over a bounded process pool
+    """
+    raw_passwords = list(raw_passwords)
+    workers = _hash_worker_count()
+    if workers <= 1 or len(raw_passwords) < 2:
+        return [make_password(raw) for raw in raw_passwords]
+    chunksize = max(1, len(raw_passwords) // (workers * 4))
+    return list(_get_hash_pool().map(make_password, raw_passwords, chunksize=chunksize))
+
+
+def import_students(rows, franchise, batch):
+    """
+    Register and enroll many new students in a batch
+
+    Rows are validated first and nothing is written if any row is invalid.
+    Registration numbers (used as usernames) are reserved in one block, and users,
+    profiles, memberships, fee records, installments and the welcome emails are
+    bulk-created in one transaction. Returns ``(created_users, errors)``.
+    """
+    cleaned_rows, errors = validate_student_rows(rows)
+    if errors or not cleaned_rows:
+        return [], errors
+
+    fee_management = BatchFeeManagement.objects.get(batch=batch)
+    passwords = hash_passwords(data['password'] for _, data in cleaned_rows)
+
+    with transaction.atomic():
+        registration_numbers = RegistrationSequence.allocate(franchise, batch, len(cleaned_rows))
+
+        new_users = []
+        for (_, data), registration_number, password in zip(cleaned_rows, registration_numbers, passwords):
+            name_parts = data['full_name'].split(' ', 1)
+            new_users.append(User(
+                username=registration_number,
+                email=data['email'],
+                first_name=name_parts[0],
+                last_name=name_parts[1] if len(name_parts) > 1 else '',
+                password=password,
+            ))
+        User.objects.bulk_create(new_users)
+        # Not every backend returns primary keys from bulk_create, so read the rows back
+        users = {user.username: user for user in User.objects.filter(username__in=registration_numbers)}
+
+        UserProfile.objects.bulk_create([
+            UserProfile(
+                user=users[registration_number],
+                name=data['full_name'],
+                phone_number=data['phone'],
+                mailing_address=data['mailing_address'],
+            )
+            for (_, data), registration_number in zip(cleaned_rows, registration_numbers)
+        ])
+
+        created_users, _ = enroll_users_in_batch(
+            [user.id for user in users.values()], franchise, batch, fee_management=fee_management
+        )
+        queue_registration_emails(created_users, batch.course.display_name)
+
+    return created_users, {}
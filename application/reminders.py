@@ -0,0 +1,88 @@
+"""
+Fee reminder campaigns for upcoming and overdue installments.
+"""
+
+import logging
+from datetime import timedelta
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import FeeReminder, Installment, OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+REMINDER_LOOKAHEAD_DAYS = 3
+REMINDER_INSERT_BATCH_SIZE = 500
+
+
+def reminder_installments(franchises=None, batches=None, today=None):
+    """
+    Installments that still need a reminder, with their student, batch and franchise
+
+    Pending installments due within the lookahead window get an 'upcoming'
+    reminder and overdue installments an 'overdue' one (annotated as
+    ``reminder_kind``); installments already reminded of that kind are left out.
+    Everything is fetched with one joined query, ordered by student.
+    """
+    today = today or timezone.now().date()
+    installments = Installment.objects.filter(
+        Q(status='pending', due_date__gte=today, due_date__lte=today + timedelta(days=REMINDER_LOOKAHEAD_DAYS))
+        | Q(status='overdue')
+    ).annotate(
+        reminder_kind=Case(When(status='overdue', then=Value('overdue')), default=Value('upcoming'))
+    ).filter(
+        ~Exists(FeeReminder.objects.filter(installment=OuterRef('pk'), kind=OuterRef('reminder_kind')))
+    )
+    if franchises is not None:
+        installments = installments.filter(student_fee_management__user_franchise__franchise__in=franchises)
+    if batches is not None:
+        installments = installments.filter(student_fee_management__user_franchise__batch__in=batches)
+    return installments.select_related(
+        'student_fee_management__user_franchise__user',
+        'student_fee_management__user_franchise__franchise',
+        'student_fee_management__user_franchise__batch__course',
+    ).order_by('student_fee_management_id', 'due_date', 'id')
+
+
+def queue_fee_reminders(franchises=None, batches=None, today=None):
+    """
+    Queue one reminder email per student covering all their due installments
+
+    The emails go to the outbox and are delivered by the send_queued_emails
+    worker. Returns ``(emails_queued, installments_reminded)``.
+    """
+    template = get_template('application/emails/fee_reminder.txt')
+    emails = []
+    reminders = []
+    installments = reminder_installments(franchises=franchises, batches=batches, today=today)
+    for _, group in groupby(installments, key=attrgetter('student_fee_management_id')):
+        group = list(group)
+        user_franchise = group[0].student_fee_management.user_franchise
+        user = user_franchise.user
+        if not user.email:
+            continue
+        emails.append(OutgoingEmail(
+            subject="Fee Payment Reminder",
+            body=template.render({
+                'user': user,
+                'batch': user_franchise.batch,
+                'franchise': user_franchise.franchise,
+                'installments': group,
+            }),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=user.email,
+        ))
+        reminders.extend(FeeReminder(installment=installment, kind=installment.reminder_kind) for installment in group)
+
+    with transaction.atomic():
+        OutgoingEmail.objects.bulk_create(emails, batch_size=REMINDER_INSERT_BATCH_SIZE)
+        FeeReminder.objects.bulk_create(reminders, batch_size=REMINDER_INSERT_BATCH_SIZE, ignore_conflicts=True)
+
+    logger.info("Queued %d fee reminder emails for %d installments", len(emails), len(reminders))
+    return len(emails), len(reminders)
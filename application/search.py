@@ -0,0 +1,235 @@
+"""
+Student search served from the denormalised StudentSearchIndex table, with
+phone numbers looked up through the PhoneIndex digit and suffix rows.
+"""
+
+import re
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+
+from common.djangoapps.student.models import UserProfile
+
+from .caching import bump_version
+from .models import PhoneIndex, StudentSearchIndex, UserFranchise
+
+SEARCH_INDEX_CHUNK_SIZE = 1000
+PHONE_SUFFIX_MIN_DIGITS = 7
+# Digits in a full phone number, with or without its country code
+PHONE_EXACT_MIN_DIGITS = 10
+
+_NON_DIGITS = re.compile(r'\D')
+# Registration numbers as allocated by RegistrationSequence: AT-FFF-BBB-SSSS
+_REGISTRATION_NUMBER = re.compile(r'^at-\d{3,}-\d{3,}-\d{4,}$')
+_EMAIL = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+_PHONE = re.compile(r'^\+?[\d\s()-]+$')
+
+
+def normalise_text(value):
+    """
+    Lower-case a value and collapse its whitespace
+    """
+    return ' '.join((value or '').lower().split())
+
+
+def digits_only(value):
+    return _NON_DIGITS.sub('', value or '')
+
+
+def phone_index_keys(phone):
+    """
+    Digit strings under which a phone number is indexed: the full number first,
+    then each shorter suffix of at least PHONE_SUFFIX_MIN_DIGITS digits
+    """
+    digits = digits_only(phone)[:20]
+    if not digits:
+        return []
+    return [digits] + [digits[start:] for start in range(1, len(digits) - PHONE_SUFFIX_MIN_DIGITS + 1)]
+
+
+def refresh_phone_index(user_ids, phones=None):
+    """
+    Rebuild the phone index rows of the given users
+
+    ``phones`` maps user ids to phone numbers when the caller already read them.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    if phones is None:
+        phones = dict(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'phone_number'))
+
+    rows = [
+        PhoneIndex(user_id=user_id, digits=digits, is_full=(position == 0))
+        for user_id in user_ids
+        for position, digits in enumerate(phone_index_keys(phones.get(user_id)))
+    ]
+    with transaction.atomic():
+        PhoneIndex.objects.filter(user_id__in=user_ids).delete()
+        PhoneIndex.objects.bulk_create(rows)
+    return len(rows)
+
+
+def rebuild_phone_index(chunk_size=SEARCH_INDEX_CHUNK_SIZE):
+    """
+    Rebuild the whole phone index, one chunk of users at a time
+    """
+    total = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            break
+        total += refresh_phone_index(user_ids)
+        last_id = user_ids[-1]
+    return total
+
+
+def phone_match_user_ids(query, exact=False):
+    """
+    User ids (as a subquery) whose phone number starts with the digits of a
+    numeric query, or ends with them once the query is long enough; with
+    ``exact`` only whole numbers match. Country codes may be missing on either
+    side: the query is also compared with the full numbers that its own
+    suffixes spell. Returns None for queries that are not phone numbers.
+    """
+    text = normalise_text(query)
+    digits = digits_only(text)
+    if not digits or any(char.isalpha() for char in text):
+        return None
+
+    # The query with its country code dropped, for numbers stored without one
+    min_digits = PHONE_EXACT_MIN_DIGITS if exact else PHONE_SUFFIX_MIN_DIGITS
+    query_suffixes = [key for key in phone_index_keys(digits)[1:] if len(key) >= min_digits]
+
+    if exact:
+        condition = Q(digits=digits)
+    else:
+        condition = Q(is_full=True, digits__startswith=digits)
+        if len(digits) >= PHONE_SUFFIX_MIN_DIGITS:
+            # Numbers are often typed without their country code
+            condition |= Q(digits=digits)
+    if query_suffixes:
+        condition |= Q(is_full=True, digits__in=query_suffixes)
+    return PhoneIndex.objects.filter(condition).values('user_id')
+
+
+def refresh_search_index(user_ids):
+    """
+    Rebuild the search index rows of the given users
+
+    Reads the users, their phone numbers and memberships with three queries
+    and replaces their rows, and their phone index rows, in one transaction.
+    Users that no longer exist simply lose their rows.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+
+    phones = dict(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'phone_number'))
+    memberships = defaultdict(list)
+    for user_franchise in UserFranchise.objects.filter(user_id__in=user_ids).order_by('id'):
+        memberships[user_franchise.user_id].append(user_franchise)
+
+    rows = []
+    for user in User.objects.filter(id__in=user_ids).only('id', 'username', 'email', 'first_name', 'last_name'):
+        fields = {
+            'user': user,
+            'name': normalise_text(user.get_full_name()),
+            'last_name': normalise_text(user.last_name),
+            'email': normalise_text(user.email),
+            'username': normalise_text(user.username),
+            'phone': digits_only(phones.get(user.id))[:20],
+        }
+        for user_franchise in memberships[user.id] or [None]:
+            rows.append(StudentSearchIndex(
+                user_franchise=user_franchise,
+                franchise_id=user_franchise.franchise_id if user_franchise else None,
+                batch_id=user_franchise.batch_id if user_franchise else None,
+                registration_number=normalise_text(user_franchise.registration_number) if user_franchise else '',
+                **fields
+            ))
+
+    with transaction.atomic():
+        StudentSearchIndex.objects.filter(user_id__in=user_ids).delete()
+        StudentSearchIndex.objects.bulk_create(rows)
+        refresh_phone_index(user_ids, phones)
+    # Tells the in-process typeahead indexes to pick up the rewritten rows
+    bump_version('student_search')
+    return len(rows)
+
+
+def rebuild_search_index(chunk_size=SEARCH_INDEX_CHUNK_SIZE):
+    """
+    Rebuild the whole search index, one chunk of users at a time
+    """
+    total = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            break
+        total += refresh_search_index(user_ids)
+        last_id = user_ids[-1]
+    return total
+
+
+def exact_match_condition(text):
+    """
+    Equality lookup for a normalised query that is a complete registration
+    number, email address or phone number, or None for any other query
+    """
+    if _REGISTRATION_NUMBER.match(text):
+        return Q(registration_number=text)
+    if _EMAIL.match(text):
+        return Q(email=text)
+    if _PHONE.match(text) and len(digits_only(text)) >= PHONE_EXACT_MIN_DIGITS:
+        return Q(user_id__in=phone_match_user_ids(text, exact=True))
+    return None
+
+
+def exact_match_students(query):
+    """
+    Search index rows matching a complete registration number, email or phone
+    number exactly, or None when the query is not one or nothing matches
+    """
+    condition = exact_match_condition(normalise_text(query))
+    if condition is None:
+        return None
+    matches = StudentSearchIndex.objects.filter(condition)
+    return matches if matches.exists() else None
+
+
+def search_students(query):
+    """
+    Search index rows whose name, last name, email, username, registration number
+    or (for numeric queries) phone number starts with the query
+
+    Complete registration numbers, emails and phone numbers are answered with
+    an equality lookup first; the prefix search only runs when it finds nothing.
+    """
+    text = normalise_text(query)
+    if not text:
+        return StudentSearchIndex.objects.none()
+
+    exact = exact_match_students(text)
+    if exact is not None:
+        return exact
+
+    condition = (
+        Q(name__startswith=text) |
+        Q(last_name__startswith=text) |
+        Q(email__startswith=text) |
+        Q(username__startswith=text) |
+        Q(registration_number__startswith=text)
+    )
+    phone_user_ids = phone_match_user_ids(text)
+    if phone_user_ids is not None:
+        condition |= Q(user_id__in=phone_user_ids)
+    return StudentSearchIndex.objects.filter(condition)
@@ -0,0 +1,144 @@
+"""
+Signal handlers keeping cached and denormalised data in sync with the models.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from common.djangoapps.student.models import UserProfile
+
+from .caching import bump_batch_data_version, bump_receipt_version
+from .models import (
+    Batch,
+    CourseFee,
+    Franchise,
+    Installment,
+    SpecialAccessUser,
+    StudentFeeManagement,
+    UserFranchise,
+)
+from .search import refresh_search_index
+
+
+# ==============================
+# RECEIPT CACHE INVALIDATION
+# ==============================
+
+_local = threading.local()
+
+
+@contextmanager
+def installment_invalidation_suppressed():
+    """
+    Skip the per-row receipt invalidation of installments
+
+    For bulk operations that delete many installments at once and bump the
+    receipt versions of the affected students themselves.
+    """
+    previous = getattr(_local, 'suppressed', False)
+    _local.suppressed = True
+    try:
+        yield
+    finally:
+        _local.suppressed = previous
+
+
+@receiver([post_save, post_delete], sender=Installment)
+def invalidate_installment_receipts(sender, instance, **kwargs):
+    if getattr(_local, 'suppressed', False):
+        return
+    user_id = UserFranchise.objects.filter(
+        fee_management__id=instance.student_fee_management_id
+    ).values_list('user_id', flat=True).first()
+    if user_id:
+        bump_receipt_version(user_id)
+
+
+@receiver([post_save, post_delete], sender=StudentFeeManagement)
+def invalidate_student_fee_receipts(sender, instance, **kwargs):
+    user_id = UserFranchise.objects.filter(
+        id=instance.user_franchise_id
+    ).values_list('user_id', flat=True).first()
+    if user_id:
+        bump_receipt_version(user_id)
+
+
+@receiver([post_save, post_delete], sender=UserFranchise)
+def invalidate_user_franchise_receipts(sender, instance, **kwargs):
+    bump_receipt_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_profile_receipts(sender, instance, **kwargs):
+    bump_receipt_version(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_receipts(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which no receipt shows
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    bump_receipt_version(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Batch)
+def invalidate_batch_receipts(sender, instance, **kwargs):
+    # Batch number and course name appear on every receipt of the batch
+    bump_receipt_version()
+
+
+# ==============================
+# STUDENT SEARCH INDEX
+# ==============================
+
+def _refresh_search_index_on_commit(user_id):
+    # Deferred so that cascades (e.g. a user deleted with its memberships) settle first
+    transaction.on_commit(lambda: refresh_search_index([user_id]))
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    _refresh_search_index_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def index_profile(sender, instance, **kwargs):
+    _refresh_search_index_on_commit(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserFranchise)
+def index_user_franchise(sender, instance, **kwargs):
+    _refresh_search_index_on_commit(instance.user_id)
+
+
+# ==============================
+# BATCH DATA VERSION
+# ==============================
+
+def _bump_batch_data_version_on_commit():
+    # Bumping before the commit would let a concurrent request cache the old
+    # rows under the new version, where they would stay until it expires
+    transaction.on_commit(bump_batch_data_version)
+
+
+@receiver([post_save, post_delete], sender=Franchise)
+@receiver([post_save, post_delete], sender=Batch)
+@receiver([post_save, post_delete], sender=CourseFee)
+@receiver([post_save, post_delete], sender=SpecialAccessUser)
+def invalidate_batch_data(sender, **kwargs):
+    _bump_batch_data_version_on_commit()
+
+
+@receiver(m2m_changed, sender=SpecialAccessUser.allowed_franchises.through)
+@receiver(m2m_changed, sender=SpecialAccessUser.allowed_batches.through)
+def invalidate_batch_data_scope(sender, action, **kwargs):
+    # The franchises and batches a user may see are part of the lookups
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _bump_batch_data_version_on_commit()
@@ -0,0 +1,211 @@
+"""
+Optional in-process trigram index for the receipt desk typeahead.
+
+Enabled with the APPLICATION_TYPEAHEAD_INDEX setting. Each process builds the
+index lazily from StudentSearchIndex on first use and afterwards only reloads
+the students whose rows changed, detected through the 'student_search' cache
+version and the rows' updated_at watermark.
+"""
+
+import heapq
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+
+from .caching import get_version
+from .models import StudentSearchIndex
+from .search import normalise_text
+
+TYPEAHEAD_RESULT_LIMIT = 15
+TYPEAHEAD_FULL_REBUILD_SECONDS = 60 * 60
+# Share of the query trigrams an entry must contain to be a match
+TYPEAHEAD_MIN_SIMILARITY = 0.6
+# Share of the best match's score other matches need to be listed with it
+TYPEAHEAD_MIN_SIMILARITY_TO_BEST = 0.8
+# Rows are stamped before their transaction commits, so incremental reloads also
+# re-read this much before the watermark to catch rows that became visible late
+TYPEAHEAD_WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+def typeahead_enabled():
+    return getattr(settings, 'APPLICATION_TYPEAHEAD_INDEX', False)
+
+
+def _trigrams(token):
+    """
+    Trigrams of one token; words are padded like pg_trgm so that short queries
+    match word starts, while digit strings are matched anywhere
+    """
+    if not token.isdigit():
+        token = f"  {token} "
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def _text_trigrams(text):
+    grams = set()
+    for token in text.split():
+        grams |= _trigrams(token)
+    return grams
+
+
+class TrigramIndex:
+    """
+    Trigram postings over the name, phone and registration number of memberships
+
+    An index is never changed once other threads can see it: refreshes work on a
+    copy(), which shares the posting sets with the original until it first
+    writes to them, and the copy then replaces the published index.
+    """
+
+    def __init__(self):
+        self.postings = {}  # trigram -> user_franchise ids
+        self.entries = {}  # user_franchise_id -> trigrams
+        self.entry_users = {}  # user_franchise_id -> user_id
+        self.user_entries = {}  # user_id -> user_franchise ids
+        self.version = None
+        self.watermark = None
+        self.built_at = 0
+        self._shared_postings = set()
+
+    def copy(self):
+        index = TrigramIndex()
+        index.postings = dict(self.postings)
+        index.entries = dict(self.entries)
+        index.entry_users = dict(self.entry_users)
+        index.user_entries = dict(self.user_entries)
+        index.version = self.version
+        index.watermark = self.watermark
+        index.built_at = self.built_at
+        index._shared_postings = set(self.postings)  # pylint: disable=protected-access
+        return index
+
+    def _posting(self, gram):
+        """
+        Return the posting set of a trigram for writing, copying it first if shared
+        """
+        if gram in self._shared_postings:
+            self._shared_postings.discard(gram)
+            self.postings[gram] = set(self.postings[gram])
+        return self.postings.setdefault(gram, set())
+
+    def add(self, row):
+        grams = frozenset(_text_trigrams(f"{row.name} {row.phone} {row.registration_number}"))
+        self.entries[row.user_franchise_id] = grams
+        self.entry_users[row.user_franchise_id] = row.user_id
+        self.user_entries[row.user_id] = self.user_entries.get(row.user_id, frozenset()) | {row.user_franchise_id}
+        for gram in grams:
+            self._posting(gram).add(row.user_franchise_id)
+
+    def remove_entry(self, entry_id):
+        user_id = self.entry_users.pop(entry_id)
+        remaining = self.user_entries.pop(user_id) - {entry_id}
+        if remaining:
+            self.user_entries[user_id] = remaining
+        for gram in self.entries.pop(entry_id):
+            self._posting(gram).discard(entry_id)
+
+    def remove_user(self, user_id):
+        for entry_id in self.user_entries.pop(user_id, ()):
+            self.entry_users.pop(entry_id)
+            for gram in self.entries.pop(entry_id):
+                self._posting(gram).discard(entry_id)
+
+    def load(self, rows):
+        for row in rows:
+            if self.watermark is None or row.updated_at > self.watermark:
+                self.watermark = row.updated_at
+            self.add(row)
+
+    def search(self, query, limit=TYPEAHEAD_RESULT_LIMIT):
+        """
+        Return up to ``limit`` user_franchise ids ranked by trigram similarity
+        """
+        query_grams = _text_trigrams(normalise_text(query))
+        if not query_grams:
+            return []
+        needed = max(1, int(len(query_grams) * TYPEAHEAD_MIN_SIMILARITY + 0.5))
+
+        # A match holds at least `needed` query trigrams, so it must appear in one
+        # of the len - needed + 1 rarest postings: only those are scanned for candidates
+        postings = sorted((self.postings.get(gram, ()) for gram in query_grams), key=len)
+        candidates = set().union(*postings[:len(query_grams) - needed + 1])
+
+        scored = []
+        for entry_id in candidates:
+            grams = self.entries[entry_id]
+            score = len(query_grams & grams)
+            if score >= needed:
+                scored.append((score, -len(grams), entry_id))
+        if not scored:
+            return []
+
+        # Near misses are only shown when nothing matches much better
+        best_score = max(scored)[0]
+        cutoff = best_score * TYPEAHEAD_MIN_SIMILARITY_TO_BEST
+        return [entry_id for score, _, entry_id in heapq.nlargest(limit, scored) if score >= cutoff]
+
+
+def _rows(queryset):
+    return _indexed(queryset).only(
+        'user_id', 'user_franchise_id', 'name', 'phone', 'registration_number', 'updated_at'
+    ).iterator(chunk_size=2000)
+
+
+def _indexed(queryset):
+    return queryset.filter(user_franchise__isnull=False, user__is_active=True)
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_typeahead_index():
+    """
+    Return this process's trigram index, building or refreshing it when needed
+
+    Readers never take the lock: a refreshed index is built aside and published
+    with a single assignment, so a search always sees one consistent index.
+    """
+    global _index  # pylint: disable=global-statement
+    version = get_version('student_search')
+    index = _index
+    if (index is not None and index.version == version
+            and time.monotonic() - index.built_at < TYPEAHEAD_FULL_REBUILD_SECONDS):
+        return index
+
+    with _lock:
+        index = _index
+        if index is None or time.monotonic() - index.built_at >= TYPEAHEAD_FULL_REBUILD_SECONDS:
+            index = TrigramIndex()
+            index.version = version
+            index.built_at = time.monotonic()
+            index.load(_rows(StudentSearchIndex.objects.all()))
+            _index = index
+        elif index.version != version:
+            index = index.copy()
+            changed = StudentSearchIndex.objects.all()
+            if index.watermark is not None:
+                # Every refresh rewrites all rows of a student, so one new row marks the student
+                changed = changed.filter(updated_at__gte=index.watermark - TYPEAHEAD_WATERMARK_OVERLAP)
+            # Students re-read because of the overlap are replaced, never added twice
+            user_ids = set(changed.values_list('user_id', flat=True))
+            for user_id in user_ids:
+                index.remove_user(user_id)
+            index.load(_rows(StudentSearchIndex.objects.filter(user_id__in=user_ids)))
+            # Deleted users and memberships leave no new row behind, so drop every
+            # entry that is no longer in the search index
+            live = set(_indexed(StudentSearchIndex.objects.all()).values_list('user_franchise_id', flat=True))
+            for entry_id in index.entries.keys() - live:
+                index.remove_entry(entry_id)
+            index.version = version
+            _index = index
+    return index
+
+
+def typeahead_search(query, limit=TYPEAHEAD_RESULT_LIMIT):
+    """
+    Ranked user_franchise ids for a typeahead query
+    """
+    return get_typeahead_index().search(query, limit=limit)
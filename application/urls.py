@@ -9,18 +9,23 @@ urlpatterns = [
     path('student-register/', views.user_register, name='user_register'),
     path('enroll-existing-user/', views.enroll_existing_user_general, name='enroll_existing_user_general'),
     path('get-batches/<int:franchise_id>/', views.get_batches, name='get_batches'),
+    path('batch-tree/', views.batch_tree, name='batch_tree'),
     path('course/', views.course_fee_list, name='course_fee_list'),
     path('fee-reminders/', views.fee_reminders, name='fee_reminders'),
+    path('fee-reminders/jobs/<int:pk>/', views.enrollment_job_status, name='enrollment_job_status'),
     path('franchises/', views.franchise_list, name='franchise_list'),
     path('franchise/register/', views.franchise_register, name='franchise_register'),
     path('franchise/<int:pk>/edit/', views.franchise_edit, name='franchise_edit'),
     path('franchise/<int:pk>/report/', views.franchise_report, name='franchise_report'),
+    path('franchise/<int:pk>/students/', views.franchise_report_students, name='franchise_report_students'),
     path('franchise/<int:pk>/batch/add/', views.batch_create, name='batch_create'),
     path('franchise/<int:franchise_pk>/batch/<int:batch_pk>/students/', views.batch_students, name='batch_students'),
     path('franchise/<int:franchise_pk>/batch/<int:batch_pk>/student/<int:user_pk>/', views.student_detail, name='student_detail'),
     path('franchise/<int:franchise_pk>/batch/<int:batch_pk>/student/<int:user_pk>/edit/', views.edit_student_details, name='edit_student_details'),
     path('franchise/<int:franchise_pk>/batch/<int:batch_pk>/register/', views.batch_user_register, name='batch_user_register'),
+    path('franchise/<int:franchise_pk>/batch/<int:batch_pk>/import/', views.batch_user_import, name='batch_user_import'),
     path('franchise/<int:franchise_pk>/batch/<int:batch_pk>/fee-management/', views.batch_fee_management, name='batch_fee_management'),
+    path('franchise/<int:franchise_pk>/batch/<int:batch_pk>/fee-management/replan/', views.batch_installment_replan, name='batch_installment_replan'),
     path('franchise/<int:franchise_pk>/batch/<int:batch_pk>/student-fee-management/<int:user_pk>/', views.student_fee_management, name='student_fee_management'),
     path('franchise/<int:franchise_pk>/batch/<int:batch_pk>/student-fee-management/<int:user_pk>/print-installment-invoice/<int:installment_pk>/', views.print_installment_invoice, name='print_installment_invoice'),
     path('franchise/<int:franchise_pk>/batch/<int:batch_pk>/student-fee-management/<int:user_pk>/edit-installment/', views.edit_installment_setup, name='edit_installment_setup'),
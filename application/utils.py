@@ -1,7 +1,25 @@
-from django.core.mail import send_mail
+import logging
+import time
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 
-def send_welcome_email(user):
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_MAX_ATTEMPTS = 5
+EMAIL_RETRY_BASE_DELAY = timedelta(minutes=1)
+EMAIL_RETRY_MAX_DELAY = timedelta(hours=6)
+# How long a claimed email is reserved for its worker; after that another worker may retry it
+EMAIL_SEND_LEASE = timedelta(minutes=10)
+
+
+def _welcome_email(user):
     subject = "Welcome to EzfinTutor!"
     message = f"""
     Hi {user.get_full_name() or user.username},
@@ -13,9 +31,9 @@ def send_welcome_email(user):
     Best regards,
     EzfinTutor Team
     """
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email], fail_silently=False)
+    return OutgoingEmail(subject=subject, body=message, from_email=settings.DEFAULT_FROM_EMAIL, to=user.email)
 
-def send_enrollment_email(user, course_name):
+def _enrollment_email(user, course_name):
     subject = "Enrollment Confirmation"
     message = f"""
     Hi {user.get_full_name() or user.username},
@@ -28,4 +46,127 @@ def send_enrollment_email(user, course_name):
     Best wishes,
     EzfinTutor Team
     """
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [user.email], fail_silently=False)
+    return OutgoingEmail(subject=subject, body=message, from_email=settings.DEFAULT_FROM_EMAIL, to=user.email)
+
+def send_welcome_email(user):
+    """Queue the welcome email; it is delivered by the send_queued_emails worker"""
+    email = _welcome_email(user)
+    email.save()
+    return email
+
+def send_enrollment_email(user, course_name):
+    """Queue the enrollment confirmation; it is delivered by the send_queued_emails worker"""
+    email = _enrollment_email(user, course_name)
+    email.save()
+    return email
+
+def queue_registration_emails(users, course_name):
+    """Queue the welcome and enrollment emails of many new students with one insert"""
+    emails = []
+    for user in users:
+        emails.append(_welcome_email(user))
+        emails.append(_enrollment_email(user, course_name))
+    return OutgoingEmail.objects.bulk_create(emails)
+
+
+def _retry_delay(attempts):
+    return min(EMAIL_RETRY_BASE_DELAY * 2 ** (attempts - 1), EMAIL_RETRY_MAX_DELAY)
+
+def _claim_queued_emails(batch_size):
+    """
+    Reserve a batch of due emails for this worker in a short transaction
+
+    Claimed rows are marked 'sending' with a lease in ``next_attempt_at`` and
+    their attempt is counted up front, so the row locks are released before
+    any mail is sent. Emails whose lease ran out (their worker died while
+    sending) are claimed again, so delivery is at least once.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=('pending', 'sending'), next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        for email in emails:
+            email.status = 'sending'
+            email.attempts += 1
+            email.next_attempt_at = now + EMAIL_SEND_LEASE
+        OutgoingEmail.objects.bulk_update(emails, ['status', 'attempts', 'next_attempt_at'])
+    return emails
+
+
+def deliver_queued_emails(batch_size=EMAIL_OUTBOX_BATCH_SIZE, max_attempts=EMAIL_MAX_ATTEMPTS):
+    """
+    Send one batch of due outbox emails over a single mail connection
+
+    Failed messages are retried with exponential backoff and marked failed after
+    ``max_attempts``. The batch is claimed in its own transaction and sent
+    outside of it, so a slow mail server holds no row locks and several workers
+    can drain the outbox side by side. Returns ``(sent, deferred, failed)``
+    counts for the batch.
+    """
+    emails = _claim_queued_emails(batch_size)
+    if not emails:
+        return 0, 0, 0
+
+    sent = deferred = failed = 0
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error("Could not connect to the mail server: %s", e)
+        connection = None
+        connection_error = str(e)
+
+    for email in emails:
+        try:
+            if connection is None:
+                raise ConnectionError(connection_error)
+            EmailMessage(
+                email.subject, email.body, email.from_email, email.recipients, connection=connection
+            ).send()
+        except Exception as e:  # pylint: disable=broad-except
+            email.last_error = str(e)
+            if email.attempts >= max_attempts:
+                email.status = 'failed'
+                failed += 1
+                logger.error("Giving up on email %s to %s: %s", email.id, email.to, e)
+            else:
+                email.status = 'pending'
+                email.next_attempt_at = timezone.now() + _retry_delay(email.attempts)
+                deferred += 1
+        else:
+            email.status = 'sent'
+            email.sent_at = timezone.now()
+            email.last_error = ''
+            sent += 1
+
+    if connection is not None:
+        connection.close()
+
+    OutgoingEmail.objects.bulk_update(emails, ['status', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, deferred, failed
+
+
+def drain_outbox(batch_size=EMAIL_OUTBOX_BATCH_SIZE, max_attempts=EMAIL_MAX_ATTEMPTS, rate_limit=None):
+    """
+    Deliver batches until no due email is left, sending at most ``rate_limit`` emails per second
+
+    ``rate_limit`` defaults to the APPLICATION_EMAIL_RATE_LIMIT setting; ``None`` or 0
+    means unlimited. Returns the ``(sent, deferred, failed)`` totals.
+    """
+    if rate_limit is None:
+        rate_limit = getattr(settings, 'APPLICATION_EMAIL_RATE_LIMIT', None)
+    total_sent = total_deferred = total_failed = 0
+    while True:
+        started = time.monotonic()
+        sent, deferred, failed = deliver_queued_emails(batch_size=batch_size, max_attempts=max_attempts)
+        if not (sent or deferred or failed):
+            return total_sent, total_deferred, total_failed
+        total_sent += sent
+        total_deferred += deferred
+        total_failed += failed
+        if rate_limit:
+            # Stretch each batch to the time its messages are allowed to take
+            time.sleep(max(0, (sent + deferred + failed) / rate_limit - (time.monotonic() - started)))
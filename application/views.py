@@ -2,11 +2,18 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.models import User, Group, Permission
 from django.db import models
 from django.http import JsonResponse, HttpResponseForbidden
-from .forms import FranchiseForm, BatchForm, FranchiseUserRegistrationForm, BatchFeeManagementForm, StudentFeeManagementForm, InstallmentForm, EditInstallmentForm, PaymentForm, StudentEditForm,StudentDiscountForm, SpecialAccessRegistrationForm, SpecialAccessUserRegistrationForm, RoleForm, EditSpecialAccessUserForm
-from .models import Franchise, UserFranchise, Batch, BatchFeeManagement, StudentFeeManagement, Installment, InstallmentTemplate, CourseFee, SpecialAccessUser, Payment
+from .forms import FranchiseForm, BatchForm, FranchiseUserRegistrationForm, BatchFeeManagementForm, StudentFeeManagementForm, InstallmentForm, EditInstallmentForm, PaymentForm, StudentEditForm,StudentDiscountForm, SpecialAccessRegistrationForm, SpecialAccessUserRegistrationForm, RoleForm, EditSpecialAccessUserForm, StudentImportForm
+from .models import Franchise, UserFranchise, Batch, BatchFeeManagement, StudentFeeManagement, Installment, InstallmentTemplate, CourseFee, SpecialAccessUser, Payment, EnrollmentJob
+from .caching import bump_batch_data_version, bump_receipt_version, cached_receipt, receipt_cache_key, versioned_json
+from .enrollment import active_enrollments, enroll_users_in_batch, queue_enrollment_job
+from .fees import apply_batch_replan, create_installment_schedules, plan_batch_replan, reschedule_installments
+from .registration import import_students, parse_student_csv
+from .reminders import queue_fee_reminders
+from .search import exact_match_students, phone_match_user_ids, search_students
+from .typeahead import TYPEAHEAD_RESULT_LIMIT, typeahead_enabled, typeahead_search
 from django.contrib.auth.decorators import login_required, user_passes_test
 from collections import defaultdict
-from django.db.models import Count, Case, When, Value, IntegerField
+from django.db.models import Count, Case, F, When, Value, IntegerField
 from django.urls import reverse
 from django.forms import modelformset_factory
 from datetime import timedelta, datetime
@@ -14,11 +21,12 @@ from django.utils import timezone
 from django.db import OperationalError, transaction
 from time import sleep
 from django.db.models import Q
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 from django.db.models import Sum
-from django.db.models.functions import TruncMonth
+from django.db.models.functions import Concat, TruncMonth
 from django.core.exceptions import PermissionDenied
+from django.core import signing
 from django.contrib import messages
 import json
 
@@ -172,6 +180,14 @@ def get_allowed_batches(user):
     except SpecialAccessUser.DoesNotExist:
         return Batch.objects.none()
 
+def get_allowed_enrollment_jobs(user):
+    """
+    Get the bulk enrollment jobs the user is allowed to follow: their own, or all for superusers
+    """
+    if user.is_superuser:
+        return EnrollmentJob.objects.all()
+    return EnrollmentJob.objects.filter(created_by=user)
+
 def superuser_required(view_func):
     def _wrapped_view(request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -218,10 +234,12 @@ VIEW_PERMISSIONS = {
     'edit_student_details': 'change_userfranchise',
     'user_register': 'add_userfranchise',
     'batch_user_register': 'add_userfranchise',
+    'batch_user_import': 'add_userfranchise',
     'enroll_existing_user': 'add_userfranchise',
     'batch_fee_management': 'change_batchfeemanagement',
     'student_fee_management': 'change_studentfeemanagement',
     'edit_installment_setup': 'change_installment',
+    'batch_installment_replan': 'change_installment',
     'receipt_search': 'process_payment',
     'receipt_detail': 'process_payment',
     'special_access_register': 'add_specialaccessuser',
@@ -300,7 +318,7 @@ def fee_report(request):
     total_fees = installment_queryset.aggregate(total=Sum('amount'))['total'] or 0
     total_received = installment_queryset.aggregate(total=Sum('payed_amount'))['total'] or 0
     total_pending = total_fees - total_received
-    overdue_installments = installment_queryset.filter(due_date__lt=today).exclude(status='paid')
+    overdue_installments = installment_queryset.filter(status='overdue')
     total_overdue = sum(inst.amount - inst.payed_amount for inst in overdue_installments) or 0
 
     if batch_id:
@@ -348,7 +366,7 @@ def fee_report(request):
                     installments = student_fee.installments.all()
                     batch_received += sum(inst.payed_amount for inst in installments)
                     batch_pending += sum(inst.amount - inst.payed_amount for inst in installments)
-                    batch_overdue += sum(inst.amount - inst.payed_amount for inst in installments.filter(due_date__lt=today).exclude(status='paid'))
+                    batch_overdue += sum(inst.amount - inst.payed_amount for inst in installments.filter(status='overdue'))
                 except StudentFeeManagement.DoesNotExist:
                     continue
             batches_data.append({
@@ -411,29 +429,58 @@ def franchise_list(request):
     search_query = request.GET.get('search', '').strip()
 
     if search_query:
-        # Franchises that match the search query
-        matching_franchises = franchises.filter(
-            Q(name__icontains=search_query) |
-            Q(location__icontains=search_query) |
-            Q(coordinator__icontains=search_query) |
-            Q(contact_no__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
-        # Franchises that do not match
-        non_matching_franchises = franchises.exclude(
-            Q(name__icontains=search_query) |
-            Q(location__icontains=search_query) |
-            Q(coordinator__icontains=search_query) |
-            Q(contact_no__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
-        # Combine: matching first, then non-matching
-        franchises = list(matching_franchises) + list(non_matching_franchises)
+        # Matching franchises first (best matches on top), then all the others
+        franchises = franchises.annotate(
+            search_rank=Case(
+                When(name__iexact=search_query, then=Value(0)),
+                When(name__istartswith=search_query, then=Value(1)),
+                When(
+                    Q(name__icontains=search_query) |
+                    Q(location__icontains=search_query) |
+                    Q(coordinator__icontains=search_query) |
+                    Q(contact_no__icontains=search_query) |
+                    Q(email__icontains=search_query),
+                    then=Value(2)
+                ),
+                default=Value(3),
+                output_field=IntegerField(),
+            )
+        ).order_by('search_rank', 'id')
     else:
-        franchises = list(franchises)
+        franchises = franchises.order_by('id')
+
+    paginator = Paginator(franchises, 20)
+    page = request.GET.get('page')
+    try:
+        franchises_page = paginator.page(page)
+    except PageNotAnInteger:
+        franchises_page = paginator.page(1)
+    except EmptyPage:
+        franchises_page = paginator.page(paginator.num_pages)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'results': [
+                {
+                    'id': franchise.id,
+                    'name': franchise.name,
+                    'location': franchise.location,
+                    'coordinator': franchise.coordinator,
+                    'contact_no': franchise.contact_no,
+                    'email': franchise.email,
+                    'registration_date': franchise.registration_date.isoformat() if franchise.registration_date else None,
+                    'matches': getattr(franchise, 'search_rank', 0) < 3,
+                    'report_url': reverse('application:franchise_report', args=[franchise.pk]),
+                }
+                for franchise in franchises_page
+            ],
+            'page': franchises_page.number,
+            'num_pages': paginator.num_pages,
+            'count': paginator.count,
+        })
 
     return render(request, 'application/franchise_management.html', {
-        'franchises': franchises,
+        'franchises': franchises_page,
         'search_query': search_query
     })
 
@@ -477,16 +524,14 @@ def user_register(request):
                     if franchise not in allowed_franchises:
                         form.add_error(None, 'You do not have permission to register users for this franchise.')
                     else:
-                        user = form.save(franchise=franchise, batch=batch, commit=True)
-                        CourseEnrollment.enroll(user, batch.course.id)
+                        with transaction.atomic():
+                            user = form.save(franchise=franchise, batch=batch, commit=True)
+                            CourseEnrollment.enroll(user, batch.course.id)
 
-                        # 📨 Send welcome + enrollment emails
-                        try:
+                            # 📨 Queue welcome + enrollment emails with the registration
                             send_welcome_email(user)
                             send_enrollment_email(user, batch.course.display_name)
-                            messages.success(request, f"User {user.username} registered and welcome mail sent successfully.")
-                        except Exception as e:
-                            messages.warning(request, f"User registered successfully, but failed to send email: {e}")
+                        messages.success(request, f"User {user.username} registered and welcome mail queued.")
 
                         return redirect('application:homepage')
             except (Franchise.DoesNotExist, Batch.DoesNotExist, ValueError):
@@ -513,18 +558,9 @@ def receipt_search(request):
 
     if search_query:
         user_franchises = UserFranchise.objects.select_related('user', 'batch').filter(
-            Q(registration_number__icontains=search_query) |
-            Q(user__email__icontains=search_query) |
-            Q(user__first_name__icontains=search_query) |
-            Q(user__last_name__icontains=search_query) |
-            Q(user__username__icontains=search_query)
+            id__in=search_students(search_query).values('user_franchise_id')
         )
 
-        user_profiles = UserProfile.objects.filter(phone_number__icontains=search_query)
-        user_ids_from_profile = [up.user_id for up in user_profiles]
-        user_franchises = user_franchises | UserFranchise.objects.filter(user_id__in=user_ids_from_profile)
-        user_franchises = user_franchises.distinct()
-
     return render(request, 'application/receipt_search.html', {
         'search_query': search_query,
         'user_franchises': user_franchises,
@@ -619,15 +655,10 @@ def special_access_register(request):
 
     form = SpecialAccessUserRegistrationForm()
     special_users = SpecialAccessUser.objects.select_related('user', 'granted_by').order_by('-granted_at')
-    # Get batch-franchise map
-    batch_franchise_map = {}
-    for batch in Batch.objects.all().select_related('franchise'):
-        if batch.franchise:
-            batch_franchise_map[str(batch.id)] = str(batch.franchise.id)
     return render(request, 'application/special_access_register.html', {
         'form': form,
         'special_users': special_users,
-        'batch_franchise_map': json.dumps(batch_franchise_map),
+        'batch_franchise_map': json.dumps(form.batch_franchise_map),
     })
 
 
@@ -659,13 +690,10 @@ def edit_special_access_user(request, user_id):
     else:
         form = EditSpecialAccessUserForm(special_access_user=special_access_user)
 
-    # Get batch-franchise map
-    batch_franchise_map = form.batch_franchise_map
-
     return render(request, 'application/edit_special_access_user.html', {
         'form': form,
         'special_access_user': special_access_user,
-        'batch_franchise_map': json.dumps(batch_franchise_map),
+        'batch_franchise_map': json.dumps(form.batch_franchise_map),
     })
 
 # ==============================
@@ -739,18 +767,45 @@ def get_batches(request, franchise_id):
     if not has_permission(request.user, 'view_franchise'):
         return JsonResponse({'error': 'Permission denied'}, status=403)
 
-    allowed_batches = get_allowed_batches(request.user)
-    batches = Batch.objects.filter(franchise_id=franchise_id, id__in=allowed_batches.values('id')).values('id', 'batch_no')
-    return JsonResponse({'batches': list(batches)})
+    def get_data():
+        allowed_batches = get_allowed_batches(request.user)
+        batches = Batch.objects.filter(franchise_id=franchise_id, id__in=allowed_batches.values('id')).values('id', 'batch_no')
+        return {'batches': list(batches)}
+
+    return versioned_json(request, get_data)
+
+@login_required
+def batch_tree(request):
+    """The franchises and batches the user may see, loaded once per page instead of per dropdown change"""
+    if not has_permission(request.user, 'view_franchise'):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+
+    def get_data():
+        allowed_franchises = get_allowed_franchises(request.user)
+        allowed_batches = get_allowed_batches(request.user)
+        batches = defaultdict(list)
+        for batch in Batch.objects.filter(
+            franchise__in=allowed_franchises, id__in=allowed_batches.values('id')
+        ).order_by('id').values('id', 'batch_no', 'franchise_id'):
+            batches[str(batch['franchise_id'])].append({'id': batch['id'], 'batch_no': batch['batch_no']})
+        return {
+            'franchises': list(allowed_franchises.order_by('name').values('id', 'name')),
+            'batches': batches,
+        }
+
+    return versioned_json(request, get_data)
 
 @login_required
 def get_course_fee(request, course_id):
     if not has_permission(request.user, 'view_franchise'):
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
-    course = get_object_or_404(CourseOverview, id=course_id)
-    fee_obj, created = CourseFee.objects.get_or_create(course=course, defaults={'fee': 0})
-    return JsonResponse({'fee': float(fee_obj.fee)})
+    def get_data():
+        course = get_object_or_404(CourseOverview, id=course_id)
+        fee = CourseFee.objects.filter(course=course).values_list('fee', flat=True).first()
+        return {'fee': float(fee or 0)}
+
+    return versioned_json(request, get_data)
 
 
 # ==============================
@@ -786,7 +841,7 @@ def franchise_fees_report(request):
     total_fees = installment_queryset.aggregate(total=Sum('amount'))['total'] or 0
     total_received = installment_queryset.aggregate(total=Sum('payed_amount'))['total'] or 0
     total_pending = total_fees - total_received
-    overdue_installments = installment_queryset.filter(due_date__lt=today).exclude(status='paid')
+    overdue_installments = installment_queryset.filter(status='overdue')
     total_overdue = sum(inst.amount - inst.payed_amount for inst in overdue_installments) or 0
 
     # Filtered totals for stats (when franchise/batch selected)
@@ -805,7 +860,7 @@ def franchise_fees_report(request):
         filtered_total_fees = batch_installments.aggregate(total=Sum('amount'))['total'] or 0
         filtered_total_received = batch_installments.aggregate(total=Sum('payed_amount'))['total'] or 0
         filtered_total_pending = filtered_total_fees - filtered_total_received
-        overdue_batch_installments = batch_installments.filter(due_date__lt=today).exclude(status='paid')
+        overdue_batch_installments = batch_installments.filter(status='overdue')
         filtered_total_overdue = sum(inst.amount - inst.payed_amount for inst in overdue_batch_installments) or 0
     elif franchise_id:
         # Calculate filtered totals for the selected franchise
@@ -819,7 +874,7 @@ def franchise_fees_report(request):
         filtered_total_fees = franchise_installments.aggregate(total=Sum('amount'))['total'] or 0
         filtered_total_received = franchise_installments.aggregate(total=Sum('payed_amount'))['total'] or 0
         filtered_total_pending = filtered_total_fees - filtered_total_received
-        overdue_franchise_installments = franchise_installments.filter(due_date__lt=today).exclude(status='paid')
+        overdue_franchise_installments = franchise_installments.filter(status='overdue')
         filtered_total_overdue = sum(inst.amount - inst.payed_amount for inst in overdue_franchise_installments) or 0
 
     if batch_id:
@@ -864,7 +919,7 @@ def franchise_fees_report(request):
                     installments = student_fee.installments.all()
                     batch_received += sum(inst.payed_amount for inst in installments)
                     batch_pending += sum(inst.amount - inst.payed_amount for inst in installments)
-                    batch_overdue += sum(inst.amount - inst.payed_amount for inst in installments.filter(due_date__lt=today).exclude(status='paid'))
+                    batch_overdue += sum(inst.amount - inst.payed_amount for inst in installments.filter(status='overdue'))
                 except StudentFeeManagement.DoesNotExist:
                     continue
             batches_data.append({
@@ -901,7 +956,7 @@ def franchise_fees_report(request):
             total = sum(inst.amount for inst in installments)
             received = sum(inst.payed_amount for inst in installments)
             pending = total - received
-            overdue = sum(inst.amount - inst.payed_amount for inst in installments.filter(due_date__lt=today).exclude(status='paid'))
+            overdue = sum(inst.amount - inst.payed_amount for inst in installments.filter(status='overdue'))
         except StudentFeeManagement.DoesNotExist:
             total = 0
             received = 0
@@ -988,7 +1043,7 @@ def monthly_fees_report(request):
     total_fees = Installment.objects.aggregate(total=Sum('amount'))['total'] or 0
     total_received = Installment.objects.aggregate(total=Sum('payed_amount'))['total'] or 0
     total_pending = total_fees - total_received
-    overdue_installments = Installment.objects.filter(due_date__lt=today).exclude(status='paid')
+    overdue_installments = Installment.objects.filter(status='overdue')
     total_overdue = sum(inst.amount - inst.payed_amount for inst in overdue_installments) or 0
 
     if selected_month:
@@ -999,7 +1054,7 @@ def monthly_fees_report(request):
         filtered_total_fees = filtered_installments.aggregate(total=Sum('amount'))['total'] or 0
         filtered_total_received = filtered_installments.aggregate(total=Sum('payed_amount'))['total'] or 0
         filtered_total_pending = filtered_total_fees - filtered_total_received
-        overdue_filtered_installments = filtered_installments.filter(due_date__lt=today).exclude(status='paid')
+        overdue_filtered_installments = filtered_installments.filter(status='overdue')
         filtered_total_overdue = sum(inst.amount - inst.payed_amount for inst in overdue_filtered_installments) or 0
     else:
         filtered_installments = Installment.objects.all()
@@ -1024,7 +1079,7 @@ def monthly_fees_report(request):
             total = sum(inst.amount for inst in installments)
             received = sum(inst.payed_amount for inst in installments)
             pending = total - received
-            overdue = sum(inst.amount - inst.payed_amount for inst in installments.filter(due_date__lt=today).exclude(status='paid'))
+            overdue = sum(inst.amount - inst.payed_amount for inst in installments.filter(status='overdue'))
         except StudentFeeManagement.DoesNotExist:
             total = received = pending = overdue = 0
 
@@ -1089,7 +1144,7 @@ def monthly_fees_report(request):
                         )
                     batch_received += sum(inst.payed_amount for inst in installments)
                     batch_pending += sum(inst.amount - inst.payed_amount for inst in installments)
-                    batch_overdue += sum(inst.amount - inst.payed_amount for inst in installments.filter(due_date__lt=today).exclude(status='paid'))
+                    batch_overdue += sum(inst.amount - inst.payed_amount for inst in installments.filter(status='overdue'))
                 except StudentFeeManagement.DoesNotExist:
                     continue
             batches_data.append({
@@ -1130,21 +1185,55 @@ def course_fee_list(request):
             'message': "You don't have permission to manage course fees"
         }, status=403)
     
-    courses = CourseOverview.objects.all()
+    # One LEFT JOIN; courses without a fee row get an unsaved one showing 0
+    courses = CourseOverview.objects.select_related('fee').order_by('id')
     course_fees = []
     for course in courses:
-        fee_obj, created = CourseFee.objects.get_or_create(course=course, defaults={'fee': 0})
+        try:
+            fee_obj = course.fee
+        except CourseFee.DoesNotExist:
+            fee_obj = CourseFee(course=course, fee=0)
         course_fees.append((course, fee_obj))
 
     if request.method == 'POST':
+        # Largest fee the column holds: max_digits minus the decimal places
+        fee_field = CourseFee._meta.get_field('fee')
+        max_fee = Decimal(10) ** (fee_field.max_digits - fee_field.decimal_places)
+        new_fees = []
+        changed_fees = []
+        invalid_courses = []
         for course, fee_obj in course_fees:
+            fee = None
             fee_value = request.POST.get(f'fee_{course.id}')
             if fee_value:
                 try:
-                    fee_obj.fee = float(fee_value)
-                    fee_obj.save()
-                except ValueError:
-                    pass
+                    fee = Decimal(fee_value)
+                    # NaN and Infinity parse and quantize without raising
+                    if not fee.is_finite() or fee < 0:
+                        raise InvalidOperation
+                    fee = fee.quantize(Decimal('0.01'))
+                    if fee >= max_fee:
+                        raise InvalidOperation
+                except InvalidOperation:
+                    fee = None
+                    invalid_courses.append(course.display_name or str(course.id))
+
+            if not fee_obj.pk:
+                if fee is not None:
+                    fee_obj.fee = fee
+                new_fees.append(fee_obj)
+            elif fee is not None and fee != fee_obj.fee:
+                # Only fees that actually changed are written
+                fee_obj.fee = fee
+                changed_fees.append(fee_obj)
+
+        with transaction.atomic():
+            CourseFee.objects.bulk_create(new_fees)
+            CourseFee.objects.bulk_update(changed_fees, ['fee'])
+            # Bulk writes bypass the signal that invalidates the course fee lookups
+            transaction.on_commit(bump_batch_data_version)
+        if invalid_courses:
+            messages.error(request, f"Invalid fees were not saved for: {', '.join(invalid_courses)}")
         return redirect('application:homepage')
 
     return render(request, 'application/course_fee_list.html', {
@@ -1162,6 +1251,36 @@ def fee_reminders(request):
     allowed_batches = get_allowed_batches(request.user)
 
     if request.method == 'POST':
+        if request.POST.get('action') == 'send_reminders':
+            emails, installments = queue_fee_reminders(
+                franchises=allowed_franchises,
+                batches=allowed_batches if allowed_batches.exists() else None,
+            )
+            if emails:
+                messages.success(request, f"{emails} reminder emails queued for {installments} installments.")
+            else:
+                messages.info(request, "All due and overdue installments have already been reminded.")
+            return redirect('application:fee_reminders')
+
+        action = request.POST.get('action')
+        if action in ['bulk_unenroll', 'bulk_enroll']:
+            installment_ids = [pk for pk in request.POST.getlist('installment_ids') if pk.isdigit()]
+            # Same scope as the overdue list the students were selected from
+            installments = Installment.objects.filter(
+                id__in=installment_ids,
+                student_fee_management__user_franchise__franchise__in=allowed_franchises,
+            )
+            if allowed_batches.exists():
+                installments = installments.filter(student_fee_management__user_franchise__batch__in=allowed_batches)
+            user_franchise_ids = installments.values_list('student_fee_management__user_franchise_id', flat=True)
+            if not user_franchise_ids:
+                messages.error(request, "Please select at least one student.")
+                return redirect('application:fee_reminders')
+            job = queue_enrollment_job(action[len('bulk_'):], user_franchise_ids, created_by=request.user)
+            verb = 'Unenrollment' if job.action == 'unenroll' else 'Re-enrollment'
+            messages.success(request, f"{verb} of {job.total} students queued.")
+            return redirect(f"{reverse('application:fee_reminders')}?job={job.id}")
+
         installment_id = request.POST.get('installment_id')
         if installment_id:
             try:
@@ -1213,9 +1332,10 @@ def fee_reminders(request):
         else:
             upcoming_installments = upcoming_installments.filter(student_fee_management__user_franchise__batch_id=upcoming_batch_id)
 
+    # Statuses are kept current by the mark_overdue_installments command
     overdue_installments = Installment.objects.filter(
-        due_date__lt=today
-    ).exclude(status='paid').select_related('student_fee_management__user_franchise__user', 'student_fee_management__user_franchise__batch', 'student_fee_management__user_franchise__batch__franchise')
+        status='overdue'
+    ).select_related('student_fee_management__user_franchise__user', 'student_fee_management__user_franchise__user__profile', 'student_fee_management__user_franchise__batch', 'student_fee_management__user_franchise__batch__franchise')
 
     # Filter by allowed franchises and batches
     overdue_installments = overdue_installments.filter(
@@ -1237,22 +1357,41 @@ def fee_reminders(request):
         else:
             overdue_installments = overdue_installments.filter(student_fee_management__user_franchise__batch_id=overdue_batch_id)
 
-    overdue_data = []
-    for installment in overdue_installments:
-        user = installment.student_fee_management.user_franchise.user
-        batch = installment.student_fee_management.user_franchise.batch
-        course_id = batch.course.id if batch and batch.course else None
-        is_enrolled = False
-        if course_id:
-            is_enrolled = CourseEnrollment.is_enrolled(user, course_id)
-        overdue_data.append({
+    paginator = Paginator(overdue_installments.order_by('due_date', 'id'), 20)
+    page = request.GET.get('overdue_page')
+    try:
+        overdue_page = paginator.page(page)
+    except PageNotAnInteger:
+        overdue_page = paginator.page(1)
+    except EmptyPage:
+        overdue_page = paginator.page(paginator.num_pages)
+
+    # Enrollment status of the whole page in one query
+    enrollment_pairs = []
+    for installment in overdue_page:
+        user_franchise = installment.student_fee_management.user_franchise
+        batch = user_franchise.batch
+        enrollment_pairs.append((user_franchise.user_id, batch.course_id if batch else None))
+    enrolled = active_enrollments(enrollment_pairs)
+
+    overdue_data = [
+        {
             'installment': installment,
-            'is_enrolled': is_enrolled
-        })
+            'is_enrolled': pair in enrolled,
+        }
+        for installment, pair in zip(overdue_page, enrollment_pairs)
+    ]
+
+    enrollment_job = None
+    job_id = request.GET.get('job', '')
+    if job_id.isdigit():
+        enrollment_job = get_allowed_enrollment_jobs(request.user).filter(id=job_id).first()
 
     return render(request, 'application/fee_reminders.html', {
         'upcoming_installments': upcoming_installments,
         'overdue_data': overdue_data,
+        'overdue_page': overdue_page,
+        'enrollment_job': enrollment_job,
         'all_franchises': allowed_franchises,
         'upcoming_franchise_id': upcoming_franchise_id,
         'upcoming_batch_id': upcoming_batch_id,
@@ -1260,6 +1399,23 @@ def fee_reminders(request):
         'overdue_batch_id': overdue_batch_id,
     })
 
+@login_required
+def enrollment_job_status(request, pk):
+    """Progress of a bulk enrollment job as JSON, polled by the fee reminders page"""
+    if not has_permission(request.user, VIEW_PERMISSIONS['fee_reminders']):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+
+    job = get_object_or_404(get_allowed_enrollment_jobs(request.user), pk=pk)
+    return JsonResponse({
+        'id': job.id,
+        'action': job.action,
+        'status': job.status,
+        'total': job.total,
+        'processed': job.processed,
+        'changed': job.changed,
+        'failed': job.failed,
+    })
+
 @login_required
 def inactive_users(request):
     if not has_permission(request.user, VIEW_PERMISSIONS['inactive_users']):
@@ -1273,31 +1429,37 @@ def inactive_users(request):
 
     if not days_min:
         days_min = '2'
+    try:
+        days_min_int = max(int(days_min), 0)
+    except ValueError:
+        days_min_int = 2
 
     allowed_franchises = get_allowed_franchises(request.user)
     allowed_batches = get_allowed_batches(request.user)
 
-    two_days_ago = timezone.now() - timedelta(days=2)
-    inactive_users = User.objects.filter(
-        models.Q(last_login__isnull=True) | models.Q(last_login__lt=two_days_ago)
-    ).filter(userfranchise__isnull=False).distinct().order_by('last_login')
-
-    # Filter by allowed franchises and batches
-    inactive_users = inactive_users.filter(userfranchise__franchise__in=allowed_franchises)
+    # Memberships in scope; users are matched against them in a subquery so no DISTINCT is needed
+    memberships = UserFranchise.objects.filter(franchise__in=allowed_franchises)
     if allowed_batches.exists():
-        inactive_users = inactive_users.filter(userfranchise__batch__in=allowed_batches)
+        memberships = memberships.filter(batch__in=allowed_batches)
 
     if franchise_id:
         if franchise_id not in [str(f.id) for f in allowed_franchises]:
-            inactive_users = User.objects.none()
+            memberships = UserFranchise.objects.none()
         else:
-            inactive_users = inactive_users.filter(userfranchise__franchise_id=franchise_id)
+            memberships = memberships.filter(franchise_id=franchise_id)
 
     if batch_id:
         if batch_id not in [str(b.id) for b in allowed_batches]:
-            inactive_users = User.objects.none()
+            memberships = UserFranchise.objects.none()
         else:
-            inactive_users = inactive_users.filter(userfranchise__batch_id=batch_id)
+            memberships = memberships.filter(batch_id=batch_id)
+
+    now = timezone.now()
+    inactive_since = now - timedelta(days=days_min_int)
+    inactive_users = User.objects.filter(
+        models.Q(last_login__isnull=True) | models.Q(last_login__lte=inactive_since),
+        id__in=memberships.values('user_id'),
+    ).select_related('profile').order_by('last_login', 'id')
 
     paginator = Paginator(inactive_users, 20)
     page = request.GET.get('page')
@@ -1309,8 +1471,14 @@ def inactive_users(request):
     except EmptyPage:
         users_page = paginator.page(paginator.num_pages)
 
+    # First membership of every user on the page, in one query
+    first_memberships = {}
+    for user_franchise in UserFranchise.objects.filter(
+        user_id__in=[user.id for user in users_page]
+    ).select_related('batch', 'franchise').order_by('user_id', 'id'):
+        first_memberships.setdefault(user_franchise.user_id, user_franchise)
+
     user_data = []
-    now = timezone.now()
     for user in users_page:
         if user.last_login:
             days_inactive = (now - user.last_login).days
@@ -1318,35 +1486,23 @@ def inactive_users(request):
             days_inactive = None
 
         try:
-            profile = UserProfile.objects.get(user=user)
-            phone_number = profile.phone_number
+            phone_number = user.profile.phone_number
         except UserProfile.DoesNotExist:
             phone_number = None
 
-        user_franchise = UserFranchise.objects.filter(user=user).first()
-        batch = user_franchise.batch if user_franchise else None
-        franchise = user_franchise.franchise if user_franchise else None
-
+        user_franchise = first_memberships.get(user.id)
         user_data.append({
             'user': user,
             'days_inactive': days_inactive,
             'phone_number': phone_number,
-            'batch': batch,
-            'franchise': franchise,
+            'batch': user_franchise.batch if user_franchise else None,
+            'franchise': user_franchise.franchise if user_franchise else None,
         })
 
-    if days_min:
-        try:
-            days_min_int = int(days_min)
-            user_data = [d for d in user_data if d['days_inactive'] is None or (d['days_inactive'] is not None and d['days_inactive'] >= days_min_int)]
-        except ValueError:
-            pass
-
     batches = Batch.objects.filter(franchise_id=franchise_id, id__in=allowed_batches.values('id')) if franchise_id else Batch.objects.none()
 
     return render(request, 'application/inactive_users.html', {
         'user_data': user_data,
-        'two_days_ago': two_days_ago,
         'users_page': users_page,
         'all_franchises': allowed_franchises,
         'batches': batches,
@@ -1390,16 +1546,11 @@ def franchise_report(request, pk):
             'message': "You don't have permission to access this franchise"
         }, status=403)
 
-    student_ids = list(
-        UserFranchise.objects.filter(franchise=franchise).values_list('user_id', flat=True)
-    )
-    enrollments = CourseEnrollment.objects.filter(
-        user_id__in=student_ids,
-        is_active=True
-    )
-
+    # Students are matched in a subquery instead of an IN list of every student id
+    franchise_student_ids = UserFranchise.objects.filter(franchise=franchise).values('user_id')
     course_counts = (
-        enrollments.values('course_id')
+        CourseEnrollment.objects.filter(user_id__in=franchise_student_ids, is_active=True)
+        .values('course_id')
         .annotate(student_count=Count('user_id', distinct=True))
     )
     course_student_map = {row['course_id']: row['student_count'] for row in course_counts}
@@ -1408,8 +1559,6 @@ def franchise_report(request, pk):
     for course in courses:
         course.student_count = course_student_map.get(course.id, 0)
 
-    users = list(User.objects.filter(id__in=student_ids).order_by('username'))
-
     # Get only allowed batches for this franchise
     allowed_batches = get_allowed_batches(request.user)
     batches = Batch.objects.filter(franchise=franchise, id__in=allowed_batches.values('id')).select_related('course')
@@ -1417,31 +1566,67 @@ def franchise_report(request, pk):
     search_query = request.GET.get('search', '').strip()
 
     if search_query:
-        # Batches that match the search query
-        matching_batches = batches.filter(
-            Q(batch_no__icontains=search_query) |
-            Q(course__display_name__icontains=search_query) |
-            Q(fees__icontains=search_query)
-        )
-        # Batches that do not match
-        non_matching_batches = batches.exclude(
-            Q(batch_no__icontains=search_query) |
-            Q(course__display_name__icontains=search_query) |
-            Q(fees__icontains=search_query)
-        )
-        # Combine: matching first, then non-matching
-        batches = list(matching_batches) + list(non_matching_batches)
+        # Matching batches first, then non-matching
+        batches = batches.annotate(
+            search_rank=Case(
+                When(
+                    Q(batch_no__icontains=search_query) |
+                    Q(course__display_name__icontains=search_query) |
+                    Q(fees__icontains=search_query),
+                    then=Value(0)
+                ),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('search_rank', 'id')
     else:
-        batches = list(batches)
+        batches = batches.order_by('id')
 
     return render(request, 'application/franchise_report.html', {
         'franchise': franchise,
         'courses': courses,
-        'users': users,
         'batches': batches,
         'search_query': search_query
     })
 
+@login_required
+def franchise_report_students(request, pk):
+    """One page of a franchise's students as JSON, loaded lazily by the franchise report"""
+    if not has_permission(request.user, VIEW_PERMISSIONS['franchise_report']):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+
+    franchise = get_object_or_404(Franchise, pk=pk)
+    if franchise not in get_allowed_franchises(request.user):
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+
+    students = User.objects.filter(
+        id__in=UserFranchise.objects.filter(franchise=franchise).values('user_id')
+    ).order_by('username')
+
+    paginator = Paginator(students, 50)
+    page = request.GET.get('page')
+    try:
+        students_page = paginator.page(page)
+    except PageNotAnInteger:
+        students_page = paginator.page(1)
+    except EmptyPage:
+        students_page = paginator.page(paginator.num_pages)
+
+    return JsonResponse({
+        'results': [
+            {
+                'id': student.id,
+                'username': student.username,
+                'name': student.get_full_name(),
+                'email': student.email,
+            }
+            for student in students_page
+        ],
+        'page': students_page.number,
+        'has_next': students_page.has_next(),
+        'count': paginator.count,
+    })
+
 @login_required
 def batch_create(request, pk):
     if not has_permission(request.user, VIEW_PERMISSIONS['batch_create']):
@@ -1482,42 +1667,61 @@ def batch_students(request, franchise_pk, batch_pk):
     franchise = get_object_or_404(Franchise, pk=franchise_pk)
     batch = get_object_or_404(Batch, pk=batch_pk, franchise=franchise)
 
-    user_franchises = UserFranchise.objects.filter(franchise=franchise, batch=batch).select_related('user')
-    users = [uf.user for uf in user_franchises]
-
     search_query = request.GET.get('search', '').strip()
 
-    if search_query:
-        # Get user profiles for phone numbers
-        user_profiles = UserProfile.objects.filter(user__in=users).select_related('user')
-        profile_dict = {up.user_id: up.phone_number for up in user_profiles}
-
-        # Separate matching and non-matching users
-        matching_users = []
-        non_matching_users = []
-
-        for user in users:
-            phone = profile_dict.get(user.id, '')
-            full_name = user.get_full_name()
-            if (search_query.lower() in full_name.lower() or
-                search_query.lower() in user.username.lower() or
-                search_query.lower() in user.email.lower() or
-                search_query.lower() in phone.lower()):
-                matching_users.append(user)
-            else:
-                non_matching_users.append(user)
+    students = UserFranchise.objects.filter(franchise=franchise, batch=batch).select_related('user', 'user__profile').annotate(
+        total_amount=Sum('fee_management__installments__amount'),
+        paid_amount=Sum('fee_management__installments__payed_amount'),
+        overdue_count=Count('fee_management__installments', filter=Q(fee_management__installments__status='overdue')),
+    ).annotate(
+        fee_status=Case(
+            When(overdue_count__gt=0, then=Value('overdue')),
+            When(total_amount__gt=0, paid_amount__gte=F('total_amount'), then=Value('paid')),
+            When(paid_amount__gt=0, then=Value('partial')),
+            default=Value('pending'),
+            output_field=models.CharField(),
+        )
+    )
 
-        # Combine: matching first, then non-matching
-        users = matching_users + non_matching_users
+    if search_query:
+        match = (
+            Q(full_name__icontains=search_query) |
+            Q(user__username__icontains=search_query) |
+            Q(user__email__icontains=search_query)
+        )
+        phone_user_ids = phone_match_user_ids(search_query)
+        if phone_user_ids is not None:
+            match |= Q(user_id__in=phone_user_ids)
+
+        # Matching students first (exact registration number / username on top), then the others
+        students = students.annotate(
+            full_name=Concat('user__first_name', Value(' '), 'user__last_name'),
+        ).annotate(
+            search_rank=Case(
+                When(Q(registration_number__iexact=search_query) | Q(user__username__iexact=search_query), then=Value(0)),
+                When(match, then=Value(1)),
+                default=Value(2),
+                output_field=IntegerField(),
+            )
+        ).order_by('search_rank', 'id')
     else:
-        users = list(users)
+        students = students.order_by('id')
+
+    paginator = Paginator(students, 20)
+    page = request.GET.get('page')
+    try:
+        students_page = paginator.page(page)
+    except PageNotAnInteger:
+        students_page = paginator.page(1)
+    except EmptyPage:
+        students_page = paginator.page(paginator.num_pages)
 
     fees_management_set = BatchFeeManagement.objects.filter(batch=batch).exists() and InstallmentTemplate.objects.filter(batch_fee_management__batch=batch).exists()
 
     return render(request, 'application/batch_students.html', {
         'franchise': franchise,
         'batch': batch,
-        'users': users,
+        'students': students_page,
         'fees_management_set': fees_management_set,
         'search_query': search_query
     })
@@ -1546,17 +1750,8 @@ def student_detail(request, franchise_pk, batch_pk, user_pk):
 
     if not Installment.objects.filter(student_fee_management=student_fee).exists():
         templates = InstallmentTemplate.objects.filter(batch_fee_management=fee_management).order_by('id')
-        cumulative_days = 0
-        for template in templates:
-            cumulative_days += template.repayment_period_days
-            due_date = registration_date + timedelta(days=cumulative_days)
-
-            Installment.objects.create(
-                student_fee_management=student_fee,
-                due_date=due_date,
-                amount=template.amount,
-                repayment_period_days=template.repayment_period_days
-            )
+        create_installment_schedules(templates, [(student_fee, registration_date)])
+        bump_receipt_version(user.pk)
 
     if request.method == 'POST':
         action = request.POST.get('action')
@@ -1585,6 +1780,7 @@ def student_detail(request, franchise_pk, batch_pk, user_pk):
         'user_franchise': user_franchise,
         'fee_management': fee_management,
         'student_fee': student_fee,
+        'net_payable': batch.fees - student_fee.discount,
         'installments': installments,
         'is_enrolled': is_enrolled,
         'show_fee_management_button': show_fee_management_button,
@@ -1630,7 +1826,7 @@ def edit_student_details(request, franchise_pk, batch_pk, user_pk):
 from django.contrib import messages
 from django.core.mail import send_mail
 from django.conf import settings
-from .utils import send_welcome_email, send_enrollment_email  # make sure you have this file as explained earlier
+from .utils import send_welcome_email, send_enrollment_email
 
 @login_required
 def batch_user_register(request, franchise_pk, batch_pk):
@@ -1645,44 +1841,30 @@ def batch_user_register(request, franchise_pk, batch_pk):
     if request.method == "POST":
         form = FranchiseUserRegistrationForm(request.POST)
         if form.is_valid():
-            # Create and enroll user
-            user = form.save(franchise=franchise, batch=batch, commit=True)
-            CourseEnrollment.enroll(user, batch.course.id)
-
-            # Create fee management for the student
-            user_franchise = UserFranchise.objects.get(user=user, franchise=franchise, batch=batch)
             fee_management = get_object_or_404(BatchFeeManagement, batch=batch)
-            student_fee = StudentFeeManagement.objects.create(
-                user_franchise=user_franchise,
-                batch_fee_management=fee_management,
-                discount=fee_management.discount
-            )
+            with transaction.atomic():
+                # Create and enroll user
+                user = form.save(franchise=franchise, batch=batch, commit=True)
+                CourseEnrollment.enroll(user, batch.course.id)
 
-            # Create installment schedule
-            enrollment = CourseEnrollment.objects.get(user=user, course_id=batch.course.id)
-            registration_date = enrollment.created.date()
-            templates = InstallmentTemplate.objects.filter(batch_fee_management=fee_management).order_by('id')
-            cumulative_days = 0
-            for template in templates:
-                cumulative_days += template.repayment_period_days
-                due_date = registration_date + timedelta(days=cumulative_days)
-                Installment.objects.create(
-                    student_fee_management=student_fee,
-                    due_date=due_date,
-                    amount=template.amount,
-                    repayment_period_days=template.repayment_period_days
+                # Create fee management for the student
+                user_franchise = UserFranchise.objects.get(user=user, franchise=franchise, batch=batch)
+                student_fee = StudentFeeManagement.objects.create(
+                    user_franchise=user_franchise,
+                    batch_fee_management=fee_management,
+                    discount=fee_management.discount
                 )
 
-            # 📨 Send welcome + enrollment emails with proper error handling
-            try:
+                # Create installment schedule
+                enrollment = CourseEnrollment.objects.get(user=user, course_id=batch.course.id)
+                registration_date = enrollment.created.date()
+                templates = InstallmentTemplate.objects.filter(batch_fee_management=fee_management).order_by('id')
+                create_installment_schedules(templates, [(student_fee, registration_date)])
+
+                # 📨 Queue welcome + enrollment emails with the registration
                 send_welcome_email(user)
                 send_enrollment_email(user, batch.course.display_name)
-                messages.success(request, f"User {user.username} registered and welcome mail sent successfully.")
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f"Email sending failed for {user.email}: {str(e)}")
-                messages.warning(request, f"User registered successfully, but failed to send email: {str(e)}")
+            messages.success(request, f"User {user.username} registered and welcome mail queued.")
 
             return redirect('application:batch_students', franchise_pk=franchise.pk, batch_pk=batch.pk)
     else:
@@ -1694,6 +1876,46 @@ def batch_user_register(request, franchise_pk, batch_pk):
         'batch': batch,
     })
 
+@login_required
+def batch_user_import(request, franchise_pk, batch_pk):
+    if not has_permission(request.user, VIEW_PERMISSIONS['batch_user_import']):
+        return render(request, 'application/access_denied.html', {
+            'message': "You don't have permission to import batch users"
+        }, status=403)
+
+    franchise = get_object_or_404(Franchise, pk=franchise_pk)
+    batch = get_object_or_404(Batch, pk=batch_pk, franchise=franchise)
+    row_errors = {}
+
+    if request.method == "POST":
+        form = StudentImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                rows = parse_student_csv(form.cleaned_data['csv_file'])
+            except (ValueError, UnicodeDecodeError) as e:
+                form.add_error('csv_file', str(e))
+            else:
+                if not BatchFeeManagement.objects.filter(batch=batch).exists():
+                    form.add_error(None, 'Set up fees management for this batch before importing students.')
+                else:
+                    created_users, row_errors = import_students(rows, franchise, batch)
+                    if row_errors:
+                        form.add_error(None, 'No students were imported. Please fix the rows listed below.')
+                    elif not created_users:
+                        form.add_error('csv_file', 'The file does not contain any students.')
+                    else:
+                        messages.success(request, f"{len(created_users)} students registered in {batch.batch_no}.")
+                        return redirect('application:batch_students', franchise_pk=franchise.pk, batch_pk=batch.pk)
+    else:
+        form = StudentImportForm()
+
+    return render(request, 'application/batch_user_import.html', {
+        'form': form,
+        'franchise': franchise,
+        'batch': batch,
+        'row_errors': sorted(row_errors.items()),
+    })
+
 @login_required
 @superuser_required
 def test_email_config(request):
@@ -1727,40 +1949,10 @@ def enroll_existing_user(request, franchise_pk, batch_pk):
     if request.method == "POST":
         user_ids = request.POST.getlist('user_ids')
         if user_ids:
-            enrolled_users = []
-            already_enrolled = []
-            for user_id in user_ids:
-                user = get_object_or_404(User, pk=user_id)
-                if UserFranchise.objects.filter(user=user, franchise=franchise, batch=batch).exists():
-                    already_enrolled.append(user.get_full_name())
-                    continue
-
-                user_franchise = UserFranchise.objects.create(user=user, franchise=franchise, batch=batch, registration_number=user.username)
-
-                fee_management = get_object_or_404(BatchFeeManagement, batch=batch)
-                student_fee = StudentFeeManagement.objects.create(
-                    user_franchise=user_franchise,
-                    batch_fee_management=fee_management,
-                    discount=fee_management.discount
-                )
-
-                CourseEnrollment.enroll(user, batch.course.id)
-
-                enrollment = CourseEnrollment.objects.get(user=user, course_id=batch.course.id)
-                registration_date = enrollment.created.date()
-                templates = InstallmentTemplate.objects.filter(batch_fee_management=fee_management).order_by('id')
-                cumulative_days = 0
-                for template in templates:
-                    cumulative_days += template.repayment_period_days
-                    due_date = registration_date + timedelta(days=cumulative_days)
-                    Installment.objects.create(
-                        student_fee_management=student_fee,
-                        due_date=due_date,
-                        amount=template.amount,
-                        repayment_period_days=template.repayment_period_days
-                    )
-
-                enrolled_users.append(user.get_full_name())
+            fee_management = get_object_or_404(BatchFeeManagement, batch=batch)
+            enrolled, already = enroll_users_in_batch(user_ids, franchise, batch, fee_management=fee_management)
+            enrolled_users = [user.get_full_name() for user in enrolled]
+            already_enrolled = [user.get_full_name() for user in already]
 
             if enrolled_users:
                 messages.success(request, f"Users {', '.join(enrolled_users)} enrolled successfully in {batch.batch_no}.")
@@ -1771,20 +1963,9 @@ def enroll_existing_user(request, franchise_pk, batch_pk):
     search_query = request.GET.get('search_query', '').strip()
     users = []
     if search_query:
-        from common.djangoapps.student.models import UserProfile
-        profiles = UserProfile.objects.filter(phone_number__icontains=search_query)
-        user_ids_from_profile = [p.user_id for p in profiles]
-
-        users_by_fields = User.objects.filter(
-            Q(email__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(username__icontains=search_query)
-        ).filter(userfranchise__franchise=franchise).exclude(userfranchise__batch=batch)
-
-        users_by_phone = User.objects.filter(id__in=user_ids_from_profile).filter(userfranchise__franchise=franchise).exclude(userfranchise__batch=batch)
-
-        users = (users_by_fields | users_by_phone).distinct()[:20]
+        users = User.objects.filter(
+            id__in=search_students(search_query).filter(franchise=franchise).values('user_id')
+        ).exclude(userfranchise__batch=batch)[:20]
 
     return render(request, 'application/enroll_existing_user.html', {
         'franchise': franchise,
@@ -1843,6 +2024,35 @@ def batch_fee_management(request, franchise_pk, batch_pk):
         'installments': installments,
     })
 
+@login_required
+def batch_installment_replan(request, franchise_pk, batch_pk):
+    if not has_permission(request.user, VIEW_PERMISSIONS['batch_installment_replan']):
+        return render(request, 'application/access_denied.html', {
+            'message': "You don't have permission to re-plan installments"
+        }, status=403)
+
+    franchise = get_object_or_404(Franchise, pk=franchise_pk)
+    batch = get_object_or_404(Batch, pk=batch_pk, franchise=franchise)
+    fee_management = get_object_or_404(BatchFeeManagement, batch=batch)
+
+    # GET shows the dry run; POST recomputes the same plan and applies it
+    plans = plan_batch_replan(batch, fee_management=fee_management)
+
+    if request.method == "POST":
+        replanned = apply_batch_replan(plans)
+        messages.success(request, f"Installments re-planned for {replanned} students.")
+        return redirect('application:batch_students', franchise_pk=franchise.pk, batch_pk=batch.pk)
+
+    changed_plans = [plan for plan in plans if plan['changed']]
+    return render(request, 'application/batch_installment_replan.html', {
+        'franchise': franchise,
+        'batch': batch,
+        'fee_management': fee_management,
+        'templates': fee_management.installment_templates.order_by('id'),
+        'changed_plans': changed_plans,
+        'unchanged_count': len(plans) - len(changed_plans),
+    })
+
 @login_required
 def student_fee_management(request, franchise_pk, batch_pk, user_pk):
     if not has_permission(request.user, VIEW_PERMISSIONS['student_fee_management']):
@@ -1925,8 +2135,7 @@ def student_fee_management(request, franchise_pk, batch_pk, user_pk):
                                 installment.payment_date = None
                             installment.save()
 
-            total_paid = sum(inst.payed_amount for inst in Installment.objects.filter(student_fee_management=student_fee))
-            student_fee.remaining_amount = fee_management.remaining_amount - total_paid
+            # Recomputes remaining_amount from the fees, discount and paid installments
             student_fee.save()
 
         return redirect('application:student_fee_management', franchise_pk=franchise.pk, batch_pk=batch.pk, user_pk=user.pk)
@@ -1946,6 +2155,7 @@ def student_fee_management(request, franchise_pk, batch_pk, user_pk):
         'user': user,
         'fee_management': fee_management,
         'student_fee': student_fee,
+        'net_payable': batch.fees - student_fee.discount,
         'installments': installments,
         'total_paid': total_paid,
         'total_pending': total_pending,
@@ -2018,12 +2228,8 @@ def edit_installment_setup(request, franchise_pk, batch_pk, user_pk):
                         all_installments = Installment.objects.filter(
                             student_fee_management=student_fee
                         ).order_by('id')
-
-                        cumulative_days = 0
-                        for installment in all_installments:
-                            cumulative_days += installment.repayment_period_days
-                            installment.due_date = registration_date + timedelta(days=cumulative_days)
-                            installment.save()
+                        reschedule_installments(all_installments, registration_date)
+                        bump_receipt_version(user.pk)
 
                         messages.success(request, 'Installments updated successfully!')
                         return redirect('application:student_fee_management',
@@ -2043,7 +2249,10 @@ def edit_installment_setup(request, franchise_pk, batch_pk, user_pk):
 
     current_installments = Installment.objects.filter(student_fee_management=student_fee)
     total_installment_amount = sum(inst.amount for inst in current_installments)
-    amount_to_add = student_fee.remaining_amount - total_installment_amount
+    # The installments cover the whole discounted fee, paid ones included, whereas
+    # remaining_amount has the payments taken off already
+    net_payable = batch.fees - student_fee.discount
+    amount_to_add = net_payable - total_installment_amount
     amount_to_add_absolute = abs(amount_to_add)
     show_reports_button = has_permission(request.user, VIEW_PERMISSIONS['homepage'])
     show_franchise_button = has_permission(request.user, VIEW_PERMISSIONS['franchise_list'])
@@ -2058,6 +2267,7 @@ def edit_installment_setup(request, franchise_pk, batch_pk, user_pk):
         'student_fee': student_fee,
         'fee_management': fee_management,
         'enrollment': enrollment,
+        'net_payable': net_payable,
         'total_installment_amount': total_installment_amount,
         'amount_to_add': amount_to_add,
         'amount_to_add_absolute': amount_to_add_absolute,
@@ -2076,35 +2286,73 @@ def print_installment_invoice(request, franchise_pk, batch_pk, user_pk, installm
             'message': "You don't have permission to print invoices"
         }, status=403)
     
-    installment = get_object_or_404(
-        Installment.objects.select_related(
-            'student_fee_management__user_franchise__user',
-            'student_fee_management__batch_fee_management__batch__franchise'
-        ),
-        pk=installment_pk,
-        status='paid'
-    )
+    def get_context():
+        installment = get_object_or_404(
+            Installment.objects.select_related(
+                'student_fee_management__user_franchise__user',
+                'student_fee_management__batch_fee_management__batch__franchise'
+            ),
+            pk=installment_pk,
+            status='paid',
+            student_fee_management__user_franchise__user_id=user_pk
+        )
 
-    student_fee = installment.student_fee_management
-    user_franchise = student_fee.user_franchise
-    user = user_franchise.user
-    batch = student_fee.batch_fee_management.batch
-    franchise = batch.franchise
-    fee_management = student_fee.batch_fee_management
+        student_fee = installment.student_fee_management
+        user_franchise = student_fee.user_franchise
+        user = user_franchise.user
+        batch = student_fee.batch_fee_management.batch
+        franchise = batch.franchise
+        fee_management = student_fee.batch_fee_management
 
-    all_installments = Installment.objects.filter(student_fee_management=student_fee)
-    total_paid = sum(inst.payed_amount for inst in all_installments)
-    installment_balance = installment.amount - installment.payed_amount
+        total_paid = Installment.objects.filter(
+            student_fee_management=student_fee
+        ).aggregate(total=Sum('payed_amount'))['total'] or 0
+        installment_balance = installment.amount - installment.payed_amount
 
-    return render(request, 'application/print_installment_invoice.html', {
-        'franchise': franchise,
-        'batch': batch,
-        'user': user,
-        'fee_management': fee_management,
-        'installment': installment,
-        'total_paid': total_paid,
-        'installment_balance': installment_balance,
-    })
+        return {
+            'franchise': franchise,
+            'batch': batch,
+            'user': user,
+            'fee_management': fee_management,
+            'installment': installment,
+            'total_paid': total_paid,
+            'installment_balance': installment_balance,
+        }
+
+    # Paid installments are immutable, so reprints are served from the receipt cache
+    cache_key = receipt_cache_key('invoice', user_pk, installment_pk)
+    return cached_receipt(cache_key, 'application/print_installment_invoice.html', get_context)
+
+PAYMENT_TOKEN_SALT = 'application.payment'
+PAYMENT_TOKEN_MAX_AGE = 60 * 60 * 24  # one day to print the payment receipt
+
+def make_payment_token(user_franchise_id, amount, installment_ids):
+    """
+    Sign the details of a payment so they can travel in the redirect URL
+    """
+    return signing.dumps({
+        'uf': int(user_franchise_id),
+        'amount': str(amount),
+        'installments': list(installment_ids),
+        'date': timezone.now().date().isoformat(),
+    }, salt=PAYMENT_TOKEN_SALT, compress=True)
+
+def read_payment_token(token):
+    """
+    Return the payment details carried by a token, or None if it is missing, forged or expired
+    """
+    if not token:
+        return None
+    try:
+        data = signing.loads(token, salt=PAYMENT_TOKEN_SALT, max_age=PAYMENT_TOKEN_MAX_AGE)
+        return {
+            'user_franchise_id': data['uf'],
+            'amount': float(data['amount']),
+            'installments': [int(pk) for pk in data['installments']],
+            'payment_date': datetime.fromisoformat(data['date']).date(),
+        }
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
 
 @login_required
 def receipt_detail(request, franchise_id):
@@ -2186,23 +2434,23 @@ def receipt_detail(request, franchise_id):
                 installment.save()
                 affected_installments.append(installment.id)
 
-        total_paid = sum(inst.payed_amount for inst in Installment.objects.filter(student_fee_management=student_fee))
-        student_fee.remaining_amount = student_fee.batch_fee_management.remaining_amount - total_paid
+        # Recomputes remaining_amount from the fees, discount and paid installments
         student_fee.save()
 
-        request.session['payment_just_made'] = True
-        request.session['last_payment_amount'] = float(payment_amount)
-        request.session['affected_installments'] = affected_installments
-        request.session['payment_date'] = timezone.now().date().isoformat()
-        request.session['payment_user_franchise_id'] = uf_id
+        payment_token = make_payment_token(uf_id, payment_amount, affected_installments)
 
         messages.success(request, f"Payment of ₹{payment_amount} applied successfully.")
-        return redirect('application:receipt_detail', franchise_id=franchise_id)
+        receipt_url = reverse('application:receipt_detail', kwargs={'franchise_id': franchise_id})
+        return redirect(f"{receipt_url}?payment={payment_token}")
+
+    # Enrollment status of every membership in one query
+    enrolled = active_enrollments(
+        (user.id, uf.batch.course_id if uf.batch else None) for uf in all_user_franchises
+    )
 
     user_franchise_data = []
     for uf in all_user_franchises:
         installments = []
-        is_enrolled = False
         try:
             student_fee = StudentFeeManagement.objects.get(user_franchise=uf)
             installments = Installment.objects.filter(student_fee_management=student_fee).order_by('due_date')
@@ -2216,20 +2464,17 @@ def receipt_detail(request, franchise_id):
         except StudentFeeManagement.DoesNotExist:
             pass
 
-        batch = uf.batch
-        course_id = batch.course.id if batch and batch.course else None
-        if course_id:
-            is_enrolled = CourseEnrollment.is_enrolled(user, course_id)
-
         user_franchise_data.append({
             'user_franchise': uf,
             'installments': installments,
-            'is_enrolled': is_enrolled,
+            'is_enrolled': (user.id, uf.batch.course_id if uf.batch else None) in enrolled,
         })
 
-    payment_just_made = request.session.get('payment_just_made', False)
-    last_payment_amount = request.session.get('last_payment_amount', 0)
-    payment_user_franchise_id = request.session.get('payment_user_franchise_id')
+    payment_token = request.GET.get('payment', '')
+    payment = read_payment_token(payment_token)
+    payment_just_made = payment is not None
+    last_payment_amount = payment['amount'] if payment else 0
+    payment_user_franchise_id = payment['user_franchise_id'] if payment else None
     show_reports_button = has_permission(request.user, VIEW_PERMISSIONS['homepage'])
     show_franchise_button = has_permission(request.user, VIEW_PERMISSIONS['franchise_list'])
     show_receipt_button = has_permission(request.user, VIEW_PERMISSIONS['receipt_search']) 
@@ -2241,6 +2486,8 @@ def receipt_detail(request, franchise_id):
         'payment_just_made': payment_just_made,
         'last_payment_amount': last_payment_amount,
         'payment_user_franchise_id': payment_user_franchise_id,
+        'affected_installments': payment['installments'] if payment else [],
+        'payment_token': payment_token if payment else '',
         'franchise_id': franchise_id, 
         "registration_number": user_franchise.registration_number,
         'show_reports_button': show_reports_button,
@@ -2254,18 +2501,8 @@ def clear_payment_session(request, franchise_id):
         return render(request, 'application/access_denied.html', {
             'message': "You don't have permission to clear payment sessions"
         }, status=403)
-    
-    if 'payment_just_made' in request.session:
-        del request.session['payment_just_made']
-    if 'last_payment_amount' in request.session:
-        del request.session['last_payment_amount']
-    if 'affected_installments' in request.session:
-        del request.session['affected_installments']
-    if 'payment_date' in request.session:
-        del request.session['payment_date']
-    if 'payment_user_franchise_id' in request.session:
-        del request.session['payment_user_franchise_id']
-    
+
+    # Payment confirmations live in the URL token, so dropping it is all that is needed
     return redirect('application:receipt_detail', franchise_id=franchise_id)
 
 @login_required
@@ -2277,18 +2514,18 @@ def receipt_search_api(request):
     results = []
 
     if query:
-        user_franchises = UserFranchise.objects.select_related('user', 'batch').filter(
-            Q(registration_number__icontains=query) |
-            Q(user__email__icontains=query) |
-            Q(user__first_name__icontains=query) |
-            Q(user__last_name__icontains=query) |
-            Q(user__username__icontains=query)
-        )
-
-        user_profiles = UserProfile.objects.filter(phone_number__icontains=query)
-        user_ids_from_profile = [up.user_id for up in user_profiles]
-        user_franchises = user_franchises | UserFranchise.objects.filter(user_id__in=user_ids_from_profile)
-        user_franchises = user_franchises.distinct()[:15]
+        # Pasted registration numbers, emails and phone numbers skip the fuzzy typeahead
+        exact = exact_match_students(query) if typeahead_enabled() else None
+        if typeahead_enabled() and exact is None:
+            ranked_ids = typeahead_search(query, limit=TYPEAHEAD_RESULT_LIMIT)
+            found = UserFranchise.objects.select_related('user', 'batch').in_bulk(ranked_ids)
+            user_franchises = [found[uf_id] for uf_id in ranked_ids if uf_id in found]
+        else:
+            # search_students answers exact matches itself before falling back
+            matches = exact if exact is not None else search_students(query)
+            user_franchises = UserFranchise.objects.select_related('user', 'batch').filter(
+                id__in=matches.values('user_franchise_id')
+            )[:TYPEAHEAD_RESULT_LIMIT]
 
         profiles = {
             p.user_id: p.phone_number
@@ -2315,43 +2552,48 @@ def print_receipt_detail(request, franchise_id):
             'message': "You don't have permission to print receipts"
         }, status=403)
     
-    user_franchise = get_object_or_404(UserFranchise, id=franchise_id)
-    try:
-        user_profile = UserProfile.objects.get(user=user_franchise.user)
-    except UserProfile.DoesNotExist:
-        user_profile = None
+    user_franchise = get_object_or_404(UserFranchise.objects.select_related('user'), id=franchise_id)
 
-    installments = []
-    total_paid = 0
-    total_pending = 0
-    total_amount = 0
-    last_payment_date = None
+    def get_context():
+        try:
+            user_profile = UserProfile.objects.get(user=user_franchise.user)
+        except UserProfile.DoesNotExist:
+            user_profile = None
 
-    try:
-        student_fee = StudentFeeManagement.objects.get(user_franchise=user_franchise)
-        installments = Installment.objects.filter(student_fee_management=student_fee).order_by('due_date')
-
-        for installment in installments:
-            total_amount += installment.amount
-            if installment.status == 'paid':
-                total_paid += installment.payed_amount
-                if installment.payment_date and (not last_payment_date or installment.payment_date > last_payment_date):
-                    last_payment_date = installment.payment_date
-            else:
-                total_pending += (installment.amount - installment.payed_amount)
+        installments = []
+        total_paid = 0
+        total_pending = 0
+        total_amount = 0
+        last_payment_date = None
 
-    except StudentFeeManagement.DoesNotExist:
-        pass
+        try:
+            student_fee = StudentFeeManagement.objects.get(user_franchise=user_franchise)
+            installments = Installment.objects.filter(student_fee_management=student_fee).order_by('due_date')
 
-    return render(request, 'application/print_receipt_detail.html', {
-        'user_franchise': user_franchise,
-        'user_profile': user_profile,
-        'installments': installments,
-        'total_paid': total_paid,
-        'total_pending': total_pending,
-        'total_amount': total_amount,
-        'last_payment_date': last_payment_date,
-    })
+            for installment in installments:
+                total_amount += installment.amount
+                if installment.status == 'paid':
+                    total_paid += installment.payed_amount
+                    if installment.payment_date and (not last_payment_date or installment.payment_date > last_payment_date):
+                        last_payment_date = installment.payment_date
+                else:
+                    total_pending += (installment.amount - installment.payed_amount)
+
+        except StudentFeeManagement.DoesNotExist:
+            pass
+
+        return {
+            'user_franchise': user_franchise,
+            'user_profile': user_profile,
+            'installments': installments,
+            'total_paid': total_paid,
+            'total_pending': total_pending,
+            'total_amount': total_amount,
+            'last_payment_date': last_payment_date,
+        }
+
+    cache_key = receipt_cache_key('receipt', user_franchise.user_id, user_franchise.id)
+    return cached_receipt(cache_key, 'application/print_receipt_detail.html', get_context)
 
 @login_required
 def print_payment_detail(request, franchise_id):
@@ -2360,52 +2602,49 @@ def print_payment_detail(request, franchise_id):
             'message': "You don't have permission to print payment details"
         }, status=403)
     
-    payment_franchise_id = request.session.get('payment_user_franchise_id')
-    if payment_franchise_id:
-        user_franchise = get_object_or_404(UserFranchise, id=payment_franchise_id)
+    payment = read_payment_token(request.GET.get('payment', ''))
+    if payment:
+        user_franchise = get_object_or_404(UserFranchise.objects.select_related('user'), id=payment['user_franchise_id'])
+        last_payment_amount = payment['amount']
+        affected_installment_ids = payment['installments']
+        payment_date = payment['payment_date']
     else:
-        user_franchise = get_object_or_404(UserFranchise, id=franchise_id)
-        
-    try:
-        user_profile = UserProfile.objects.get(user=user_franchise.user)
-    except UserProfile.DoesNotExist:
-        user_profile = None
-
-    last_payment_amount = request.session.get('last_payment_amount', 0)
-    affected_installment_ids = request.session.get('affected_installments', [])
-    payment_date_str = request.session.get('payment_date')
+        user_franchise = get_object_or_404(UserFranchise.objects.select_related('user'), id=franchise_id)
+        last_payment_amount = 0
+        affected_installment_ids = []
+        payment_date = timezone.now().date()
 
-    payment_date = timezone.now().date()
-    if payment_date_str:
+    def get_context():
         try:
-            payment_date = datetime.fromisoformat(payment_date_str).date()
-        except:
-            pass
-
-    try:
-        student_fee = StudentFeeManagement.objects.get(user_franchise=user_franchise)
-        installments = Installment.objects.filter(student_fee_management=student_fee).order_by('due_date')
-        recent_payments = Installment.objects.filter(
-            id__in=affected_installment_ids,
-            student_fee_management=student_fee
-        ).order_by('due_date')
-    except StudentFeeManagement.DoesNotExist:
-        installments = []
-        recent_payments = []
+            user_profile = UserProfile.objects.get(user=user_franchise.user)
+        except UserProfile.DoesNotExist:
+            user_profile = None
 
-    request.session.pop('payment_just_made', None)
-    request.session.pop('last_payment_amount', None)
-    request.session.pop('affected_installments', None)
-    request.session.pop('payment_date', None)
+        try:
+            student_fee = StudentFeeManagement.objects.get(user_franchise=user_franchise)
+            installments = Installment.objects.filter(student_fee_management=student_fee).order_by('due_date')
+            recent_payments = Installment.objects.filter(
+                id__in=affected_installment_ids,
+                student_fee_management=student_fee
+            ).order_by('due_date')
+        except StudentFeeManagement.DoesNotExist:
+            installments = []
+            recent_payments = []
+
+        return {
+            'user_franchise': user_franchise,
+            'user_profile': user_profile,
+            'last_payment_amount': last_payment_amount,
+            'payment_date': payment_date,
+            'installments': installments,
+            'recent_payments': recent_payments,
+        }
 
-    return render(request, 'application/print_payment_detail.html', {
-        'user_franchise': user_franchise,
-        'user_profile': user_profile,
-        'last_payment_amount': last_payment_amount,
-        'payment_date': payment_date,
-        'installments': installments,
-        'recent_payments': recent_payments,
-    })
+    cache_key = receipt_cache_key(
+        'payment', user_franchise.user_id, user_franchise.id, payment_date.isoformat(),
+        last_payment_amount, '-'.join(str(pk) for pk in affected_installment_ids)
+    )
+    return cached_receipt(cache_key, 'application/print_payment_detail.html', get_context)
 
 @login_required
 def combined_fees_report(request):
@@ -2464,7 +2703,7 @@ def combined_fees_report(request):
     filtered_total_fees = installments_queryset.aggregate(total=Sum('amount'))['total'] or 0
     filtered_total_received = installments_queryset.aggregate(total=Sum('payed_amount'))['total'] or 0
     filtered_total_pending = filtered_total_fees - filtered_total_received
-    overdue_installments = installments_queryset.filter(due_date__lt=today).exclude(status='paid')
+    overdue_installments = installments_queryset.filter(status='overdue')
     filtered_total_overdue = sum(inst.amount - inst.payed_amount for inst in overdue_installments) or 0
 
     franchises_queryset = Franchise.objects.prefetch_related(
@@ -2495,7 +2734,7 @@ def combined_fees_report(request):
                         )
                     batch_received += sum(inst.payed_amount for inst in installments)
                     batch_pending += sum(inst.amount - inst.payed_amount for inst in installments)
-                    batch_overdue += sum(inst.amount - inst.payed_amount for inst in installments.filter(due_date__lt=today).exclude(status='paid'))
+                    batch_overdue += sum(inst.amount - inst.payed_amount for inst in installments.filter(status='overdue'))
                 except StudentFeeManagement.DoesNotExist:
                     continue
 
@@ -2538,7 +2777,7 @@ def combined_fees_report(request):
             total = sum(inst.amount for inst in installments)
             received = sum(inst.payed_amount for inst in installments)
             pending = total - received
-            overdue = sum(inst.amount - inst.payed_amount for inst in installments.filter(due_date__lt=today).exclude(status='paid'))
+            overdue = sum(inst.amount - inst.payed_amount for inst in installments.filter(status='overdue'))
         except StudentFeeManagement.DoesNotExist:
             total = received = pending = overdue = 0
 
@@ -2604,8 +2843,11 @@ def get_batches_for_franchises(request):
         franchise_ids = [int(id) for id in franchise_ids]
     except ValueError:
         return JsonResponse({'error': 'Invalid franchise IDs'}, status=400)
-    batches = Batch.objects.filter(franchise_id__in=franchise_ids).values('id', 'batch_no', 'franchise__name')
-    return JsonResponse({'batches': list(batches)})
+    def get_data():
+        batches = Batch.objects.filter(franchise_id__in=franchise_ids).values('id', 'batch_no', 'franchise__name')
+        return {'batches': list(batches)}
+
+    return versioned_json(request, get_data)
 
 @login_required
 def student_counts(request):
@@ -2686,7 +2928,7 @@ def special_user_dashboard(request):
         total_fees += franchise_installments.aggregate(Sum('amount'))['amount__sum'] or 0
         total_received += franchise_installments.aggregate(Sum('payed_amount'))['payed_amount__sum'] or 0
         total_pending += sum(inst.amount - inst.payed_amount for inst in franchise_installments)
-        overdue_installments = franchise_installments.filter(due_date__lt=today).exclude(status='paid')
+        overdue_installments = franchise_installments.filter(status='overdue')
         total_overdue += sum(inst.amount - inst.payed_amount for inst in overdue_installments)
 
     recent_payments = Payment.objects.filter(
@@ -2736,21 +2978,9 @@ def enroll_existing_user_general(request):
     search_query = request.GET.get('search_query', '')
 
     if search_query:
-        from common.djangoapps.student.models import UserProfile
-        profiles = UserProfile.objects.filter(phone_number__icontains=search_query)
-        user_ids_from_profile = [p.user_id for p in profiles]
-
-        users_by_fields = User.objects.filter(
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(username__icontains=search_query)
-        )
-
-        users_by_phone = User.objects.filter(id__in=user_ids_from_profile)
-
-        all_users = (users_by_fields | users_by_phone).distinct()[:10]
-        user_search_results = all_users
+        user_search_results = User.objects.filter(
+            id__in=search_students(search_query).values('user_id')
+        )[:10]
 
     if request.method == 'POST':
         user_ids = request.POST.getlist('user_ids')
@@ -2767,45 +2997,9 @@ def enroll_existing_user_general(request):
                 if batch.franchise != franchise:
                     messages.error(request, 'Selected batch does not belong to the selected franchise.')
                 else:
-                    enrolled_users = []
-                    already_enrolled = []
-                    for user_id in user_ids:
-                        user = User.objects.get(id=user_id)
-                        if UserFranchise.objects.filter(user=user, franchise=franchise, batch=batch).exists():
-                            already_enrolled.append(user.get_full_name())
-                        else:
-                            user_franchise = UserFranchise.objects.create(
-                                user=user,
-                                franchise=franchise,
-                                batch=batch,
-                                registration_number=user.username
-                            )
-
-                            fee_management = BatchFeeManagement.objects.get(batch=batch)
-                            student_fee = StudentFeeManagement.objects.create(
-                                user_franchise=user_franchise,
-                                batch_fee_management=fee_management,
-                                discount=fee_management.discount
-                            )
-
-                            CourseEnrollment.enroll(user, batch.course.id)
-
-                            enrollment = CourseEnrollment.objects.get(user=user, course_id=batch.course.id)
-                            registration_date = enrollment.created.date()
-                            templates = InstallmentTemplate.objects.filter(batch_fee_management=fee_management).order_by('id')
-                            cumulative_days = 0
-                            for template in templates:
-                                cumulative_days += template.repayment_period_days
-                                due_date = registration_date + timedelta(days=cumulative_days)
-                                Installment.objects.create(
-                                    student_fee_management=student_fee,
-                                    due_date=due_date,
-                                    amount=template.amount,
-                                    repayment_period_days=template.repayment_period_days,
-                                    status='pending'
-                                )
-
-                            enrolled_users.append(user.get_full_name())
+                    enrolled, already = enroll_users_in_batch(user_ids, franchise, batch)
+                    enrolled_users = [user.get_full_name() for user in enrolled]
+                    already_enrolled = [user.get_full_name() for user in already]
 
                     if enrolled_users:
                         messages.success(request, f'Successfully enrolled {", ".join(enrolled_users)} in {batch.batch_no}.')
@@ -2909,8 +3103,7 @@ def get_batch_franchise(request, batch_id):
     if not has_permission(request.user, 'view_franchise'):
         return JsonResponse({'error': 'Permission denied'}, status=403)
     
-    try:
-        batch = Batch.objects.get(id=batch_id)
-        return JsonResponse({'franchise_id': str(batch.franchise.id)})
-    except Batch.DoesNotExist:
-        return JsonResponse({'error': 'Batch not found'}, status=404)
\ No newline at end of file
+    franchise_id = Batch.objects.filter(id=batch_id).values_list('franchise_id', flat=True).first()
+    if franchise_id is None:
+        return JsonResponse({'error': 'Batch not found'}, status=404)
+    return versioned_json(request, lambda: {'franchise_id': str(franchise_id)})
\ No newline at end of file
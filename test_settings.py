@@ -5,6 +5,7 @@ In a real-world use case, apps in this project are installed into other
 Django applications, so these settings will not be used.
 """
 
+import sys
 from os.path import abspath, dirname, join
 
 
@@ -14,6 +15,10 @@ def root(*args):
     """
     return join(abspath(dirname(__file__)), *args)
 
+# Stand-ins for the platform apps the application builds on, so the tests run
+# without Open edX; a platform already on the path takes precedence
+sys.path.append(root('test_utils', 'platform_stubs'))
+
 def plugin_settings(settings):
     print("✔ Application settings loaded!")
     settings.FEATURES['ENABLE_APPLICATION'] = True
@@ -44,6 +49,8 @@ INSTALLED_APPS = (
     'django.contrib.contenttypes',
     'django.contrib.messages',
     'django.contrib.sessions',
+    'common.djangoapps.student',
+    'openedx.core.djangoapps.content.course_overviews',
     'application',
 )
 
@@ -51,19 +58,22 @@ LOCALE_PATHS = [
     root('application', 'conf', 'locale'),
 ]
 
-ROOT_URLCONF = 'application.urls'
+ROOT_URLCONF = 'test_urls'
+
+# Fast hashing keeps the tests that create many users quick
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
 
 SECRET_KEY = 'insecure-secret-key'
 
 MIDDLEWARE = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
 )
 
 TEMPLATES = [{
     'BACKEND': 'django.template.backends.django.DjangoTemplates',
-    'APP_DIRS': False,
+    'APP_DIRS': True,
     'OPTIONS': {
         'context_processors': [
             'django.contrib.auth.context_processors.auth',  # this is required for admin
@@ -0,0 +1,16 @@
+"""
+URLs used during tests.
+
+The platform includes the application's URLs under the 'application' namespace
+and provides the login, logout and dashboard pages its templates link to.
+"""
+
+from django.http import HttpResponse
+from django.urls import include, path
+
+urlpatterns = [
+    path('', include('application.urls', namespace='application')),
+    path('login/', lambda request: HttpResponse(''), name='login'),
+    path('logout/', lambda request: HttpResponse(''), name='logout'),
+    path('dashboard/', lambda request: HttpResponse(''), name='dashboard'),
+]
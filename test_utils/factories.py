@@ -0,0 +1,93 @@
+"""
+Helpers creating the franchise, batch and student records the tests work with.
+"""
+
+from datetime import timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.utils import timezone
+from common.djangoapps.student.models import CourseEnrollment, UserProfile
+from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+
+from application.models import (
+    Batch,
+    BatchFeeManagement,
+    Franchise,
+    Installment,
+    InstallmentTemplate,
+    SpecialAccessUser,
+    StudentFeeManagement,
+    UserFranchise,
+)
+
+
+def create_course(course_id='course-v1:Org+Course+Run', display_name='Course'):
+    return CourseOverview.objects.create(id=course_id, display_name=display_name)
+
+
+def create_franchise(name='Franchise'):
+    return Franchise.objects.create(name=name, coordinator='Coordinator', contact_no='1', email='f@example.com')
+
+
+def create_batch(batch_no='B1', fees=1000, discount=100, course=None, franchise=None, installments=(450, 450)):
+    """
+    Create a batch with its fee management and one installment template per amount
+    """
+    batch = Batch.objects.create(
+        batch_no=batch_no,
+        fees=fees,
+        course=course or create_course(),
+        franchise=franchise or create_franchise(),
+    )
+    fee_management = BatchFeeManagement.objects.create(batch=batch, discount=discount)
+    for amount in installments:
+        InstallmentTemplate.objects.create(
+            batch_fee_management=fee_management, amount=amount, repayment_period_days=30
+        )
+    return batch
+
+
+def create_student(batch, username='student', phone='9876543210', discount=None, registered_days_ago=40,
+                   enroll=True):
+    """
+    Register a student in the batch with an installment schedule built from its templates
+
+    Returns the student's UserFranchise.
+    """
+    user = User.objects.create_user(
+        username, f'{username}@example.com', 'password', first_name=username.title(), last_name='Student'
+    )
+    UserProfile.objects.create(user=user, name=user.get_full_name(), phone_number=phone)
+    user_franchise = UserFranchise.objects.create(user=user, franchise=batch.franchise, batch=batch)
+    fee_management = batch.fee_management
+    student_fee = StudentFeeManagement.objects.create(
+        user_franchise=user_franchise,
+        batch_fee_management=fee_management,
+        discount=fee_management.discount if discount is None else discount,
+    )
+    due_date = timezone.now().date() - timedelta(days=registered_days_ago)
+    for template in fee_management.installment_templates.order_by('id'):
+        due_date += timedelta(days=template.repayment_period_days)
+        Installment.objects.create(
+            student_fee_management=student_fee,
+            due_date=due_date,
+            amount=template.amount,
+            repayment_period_days=template.repayment_period_days,
+        )
+    if enroll:
+        CourseEnrollment.enroll(user, batch.course_id)
+    return user_franchise
+
+
+def create_staff_user(username='staff', permissions=('view_reports',), franchises=(), batches=()):
+    """
+    Create a special access user with the given application permissions and scope
+    """
+    user = User.objects.create_user(username, f'{username}@example.com', 'password')
+    user.user_permissions.set(
+        Permission.objects.filter(content_type__app_label='application', codename__in=permissions)
+    )
+    special_access = SpecialAccessUser.objects.create(user=user)
+    special_access.allowed_franchises.set(franchises)
+    special_access.allowed_batches.set(batches)
+    return user
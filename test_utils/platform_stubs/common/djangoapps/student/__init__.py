@@ -0,0 +1,3 @@
+"""
+Stand-in for the platform's student app, used by the tests.
+"""
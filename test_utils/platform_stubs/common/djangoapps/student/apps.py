@@ -0,0 +1,11 @@
+"""
+App configuration of the student app stand-in.
+"""
+
+from django.apps import AppConfig
+
+
+class StudentConfig(AppConfig):
+    name = 'common.djangoapps.student'
+    label = 'student'
+    default_auto_field = 'django.db.models.AutoField'
@@ -0,0 +1,45 @@
+"""
+The parts of the platform's UserProfile and CourseEnrollment the application uses.
+"""
+
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class UserProfile(models.Model):
+    user = models.OneToOneField(User, unique=True, related_name='profile', on_delete=models.CASCADE)
+    name = models.CharField(blank=True, max_length=255)
+    phone_number = models.CharField(blank=True, null=True, max_length=50)
+    mailing_address = models.TextField(blank=True, null=True)
+
+    class Meta:
+        app_label = 'student'
+
+
+class CourseEnrollment(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    course = models.ForeignKey(
+        'course_overviews.CourseOverview', db_constraint=False, on_delete=models.DO_NOTHING, null=True
+    )
+    created = models.DateTimeField(auto_now_add=True, null=True)
+    is_active = models.BooleanField(default=True)
+    mode = models.CharField(default='audit', max_length=100)
+
+    class Meta:
+        app_label = 'student'
+        unique_together = (('user', 'course'),)
+
+    @classmethod
+    def enroll(cls, user, course_key, mode='audit', check_access=False):  # pylint: disable=unused-argument
+        enrollment, _ = cls.objects.update_or_create(
+            user=user, course_id=str(course_key), defaults={'is_active': True, 'mode': mode}
+        )
+        return enrollment
+
+    @classmethod
+    def unenroll(cls, user, course_id, skip_refund=False):  # pylint: disable=unused-argument
+        cls.objects.filter(user=user, course_id=str(course_id)).update(is_active=False)
+
+    @classmethod
+    def is_enrolled(cls, user, course_key):
+        return cls.objects.filter(user=user, course_id=str(course_key), is_active=True).exists()
@@ -0,0 +1,3 @@
+"""
+Stand-in for the platform's course_overviews app, used by the tests.
+"""
@@ -0,0 +1,11 @@
+"""
+App configuration of the course_overviews app stand-in.
+"""
+
+from django.apps import AppConfig
+
+
+class CourseOverviewsConfig(AppConfig):
+    name = 'openedx.core.djangoapps.content.course_overviews'
+    label = 'course_overviews'
+    default_auto_field = 'django.db.models.AutoField'
@@ -0,0 +1,20 @@
+# Named after the platform migration the application's first migration depends on
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseOverview',
+            fields=[
+                ('id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('display_name', models.TextField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,13 @@
+"""
+The parts of the platform's CourseOverview the application uses.
+"""
+
+from django.db import models
+
+
+class CourseOverview(models.Model):
+    id = models.CharField(max_length=255, primary_key=True)
+    display_name = models.TextField(null=True)
+
+    class Meta:
+        app_label = 'course_overviews'
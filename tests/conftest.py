@@ -0,0 +1,16 @@
+"""
+Fixtures shared by all test modules.
+"""
+
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Start every test with an empty cache, since cache versions outlive the test database
+    """
+    cache.clear()
+    yield
+    cache.clear()
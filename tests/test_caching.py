@@ -0,0 +1,64 @@
+"""
+Tests for the `application` caching module.
+"""
+
+from unittest import mock
+
+import pytest
+
+from application.caching import bump_receipt_version, cached_receipt, get_version, receipt_cache_key
+from test_utils.factories import create_batch, create_student
+
+
+def test_receipt_cache_key_stays_within_memcached_limit():
+    key = receipt_cache_key('receipt', 1, ','.join(str(pk) for pk in range(1000)))
+    assert len(key) < 250
+    assert key.startswith('application:receipt:receipt:1:')
+
+
+def test_receipt_cache_key_tracks_parts_and_version():
+    key = receipt_cache_key('receipt', 1, 2, 3)
+    assert receipt_cache_key('receipt', 1, 2, 3) == key
+    assert receipt_cache_key('receipt', 1, 2, 4) != key
+    bump_receipt_version(1)
+    assert receipt_cache_key('receipt', 1, 2, 3) != key
+
+
+def test_cached_receipt_renders_once():
+    get_context = mock.Mock(return_value={})
+    with mock.patch('application.caching.render_to_string', return_value='<p>receipt</p>') as render:
+        first = cached_receipt('application:receipt:test', 'receipt.html', get_context)
+        second = cached_receipt('application:receipt:test', 'receipt.html', get_context)
+    assert render.call_count == 1
+    assert get_context.call_count == 1
+    assert first.content == second.content == b'<p>receipt</p>'
+
+
+@pytest.mark.django_db
+def test_installment_save_moves_only_that_students_receipt_version():
+    batch = create_batch()
+    student = create_student(batch)
+    other = create_student(batch, username='other', phone='9876500000')
+    own_version = get_version('receipt', student.user_id)
+    other_version = get_version('receipt', other.user_id)
+
+    installment = student.fee_management.installments.first()
+    installment.amount = 500
+    installment.save()
+
+    assert get_version('receipt', student.user_id) != own_version
+    assert get_version('receipt', other.user_id) == other_version
+
+
+@pytest.mark.django_db
+def test_batch_save_moves_every_receipt_version():
+    batch = create_batch()
+    student = create_student(batch)
+    shared_version = get_version('receipt')
+    key = receipt_cache_key('receipt', student.user_id, 1)
+
+    batch.batch_no = 'B2'
+    batch.save()
+
+    assert get_version('receipt') != shared_version
+    assert receipt_cache_key('receipt', student.user_id, 1) != key
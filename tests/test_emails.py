@@ -0,0 +1,78 @@
+"""
+Tests for the email outbox in the `application` utils module.
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core import mail
+from django.db import transaction
+from django.utils import timezone
+
+from application.models import OutgoingEmail
+from application.utils import EMAIL_RETRY_BASE_DELAY, EMAIL_SEND_LEASE, deliver_queued_emails, drain_outbox
+
+
+def queue_email(**kwargs):
+    return OutgoingEmail.objects.create(
+        subject='Subject', body='Body', from_email='from@example.com', to='to@example.com', **kwargs
+    )
+
+
+@pytest.mark.django_db
+def test_drain_outbox_sends_due_emails():
+    email = queue_email()
+    later = queue_email(next_attempt_at=timezone.now() + timedelta(hours=1))
+
+    assert drain_outbox(batch_size=1) == (1, 0, 0)
+
+    assert [message.to for message in mail.outbox] == [['to@example.com']]
+    email.refresh_from_db()
+    assert (email.status, email.attempts) == ('sent', 1)
+    later.refresh_from_db()
+    assert later.status == 'pending'
+
+
+@pytest.mark.django_db
+def test_failed_sends_back_off_then_give_up():
+    email = queue_email()
+    with mock.patch('application.utils.EmailMessage.send', side_effect=OSError('refused')):
+        before = timezone.now()
+        assert deliver_queued_emails(max_attempts=2) == (0, 1, 0)
+        email.refresh_from_db()
+        assert (email.status, email.attempts, email.last_error) == ('pending', 1, 'refused')
+        assert email.next_attempt_at >= before + EMAIL_RETRY_BASE_DELAY
+
+        # Not due yet
+        assert deliver_queued_emails(max_attempts=2) == (0, 0, 0)
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        assert deliver_queued_emails(max_attempts=2) == (0, 0, 1)
+    email.refresh_from_db()
+    assert (email.status, email.attempts) == ('failed', 2)
+
+
+@pytest.mark.django_db
+def test_emails_claimed_by_another_worker_are_skipped_until_their_lease_expires():
+    email = queue_email(status='sending', attempts=1, next_attempt_at=timezone.now() + EMAIL_SEND_LEASE)
+    assert deliver_queued_emails() == (0, 0, 0)
+
+    OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+    assert deliver_queued_emails() == (1, 0, 0)
+    email.refresh_from_db()
+    assert (email.status, email.attempts) == ('sent', 2)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_emails_are_sent_outside_a_transaction():
+    queue_email()
+    sending = []
+
+    def send(_message):
+        sending.append((transaction.get_connection().in_atomic_block, OutgoingEmail.objects.get().status))
+        return 1
+
+    with mock.patch('application.utils.EmailMessage.send', autospec=True, side_effect=send):
+        assert deliver_queued_emails() == (1, 0, 0)
+    assert sending == [(False, 'sending')]
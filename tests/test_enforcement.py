@@ -0,0 +1,124 @@
+"""
+Tests for the `application` enforcement module.
+"""
+
+from datetime import date
+from unittest import mock
+
+import pytest
+from common.djangoapps.student.models import CourseEnrollment
+from django.db import DatabaseError, IntegrityError, transaction
+
+from application.enforcement import enforce_policies
+from application.fees import mark_overdue_installments
+from application.models import EnforcementAction, EnforcementPolicy, Installment, StudentFeeManagement
+from test_utils.factories import create_batch, create_course, create_student
+
+
+@pytest.fixture
+def overdue_batch():
+    """
+    A batch with one student whose first installment is ten days overdue and one who paid it
+    """
+    batch = create_batch()
+    late = create_student(batch, username='late', registered_days_ago=40)
+    paid = create_student(batch, username='paid', registered_days_ago=40)
+    Installment.objects.filter(
+        student_fee_management__user_franchise=paid, due_date__lt=date.today()
+    ).update(status='paid', payed_amount=450)
+    mark_overdue_installments()
+    return batch, late, paid
+
+
+def is_enrolled(user_franchise):
+    return CourseEnrollment.is_enrolled(user_franchise.user, user_franchise.batch.course_id)
+
+
+@pytest.mark.django_db
+def test_policy_unenrolls_overdue_students_and_reenrolls_them_once_paid(overdue_batch):
+    batch, late, paid = overdue_batch
+    EnforcementPolicy.objects.create(franchise=batch.franchise, unenroll_after_days=7)
+
+    assert enforce_policies(dry_run=True) == (1, 0, 0)
+    assert is_enrolled(late)
+
+    assert enforce_policies() == (1, 0, 0)
+    assert not is_enrolled(late)
+    assert is_enrolled(paid)
+    action = EnforcementAction.objects.get()
+    assert (action.user_franchise_id, action.action, action.overdue_amount) == (late.id, 'unenroll', 450)
+
+    # Nothing left to do until the student pays
+    assert enforce_policies() == (0, 0, 0)
+
+    Installment.objects.filter(student_fee_management__user_franchise=late).update(status='paid', payed_amount=450)
+    StudentFeeManagement.objects.filter(user_franchise=late).update(remaining_amount=0)
+    assert enforce_policies() == (0, 1, 0)
+    assert is_enrolled(late)
+
+
+@pytest.mark.django_db
+def test_batch_policy_takes_precedence_over_the_franchise_policy(overdue_batch):
+    batch, late, _ = overdue_batch
+    EnforcementPolicy.objects.create(franchise=batch.franchise, unenroll_after_days=7)
+    EnforcementPolicy.objects.create(batch=batch, unenroll_after_days=30)
+
+    assert enforce_policies() == (0, 0, 0)
+    assert is_enrolled(late)
+
+
+@pytest.mark.django_db
+def test_students_unenrolled_by_staff_are_not_reenrolled(overdue_batch):
+    batch, late, _ = overdue_batch
+    EnforcementPolicy.objects.create(franchise=batch.franchise)
+    CourseEnrollment.unenroll(late.user, batch.course_id)
+    StudentFeeManagement.objects.filter(user_franchise=late).update(remaining_amount=0)
+
+    assert enforce_policies() == (0, 0, 0)
+    assert not is_enrolled(late)
+
+
+@pytest.mark.django_db
+def test_a_failed_unenroll_does_not_roll_back_the_rest_of_its_chunk(overdue_batch):
+    batch, late, _ = overdue_batch
+    later = create_student(batch, username='later', registered_days_ago=40)
+    mark_overdue_installments()
+    EnforcementPolicy.objects.create(franchise=batch.franchise, unenroll_after_days=7)
+    unenroll = CourseEnrollment.unenroll
+
+    def failing_unenroll(user, course_id):
+        if user.pk == late.user_id:
+            # Breaks the transaction it runs in, as a failed statement does on PostgreSQL
+            with transaction.atomic(savepoint=False):
+                raise DatabaseError('deadlock detected')
+        return unenroll(user, course_id)
+
+    with mock.patch.object(CourseEnrollment, 'unenroll', side_effect=failing_unenroll):
+        assert enforce_policies() == (1, 0, 1)
+
+    assert is_enrolled(late)
+    assert not is_enrolled(later)
+    assert sorted(EnforcementAction.objects.values_list('user_franchise_id', 'error')) == sorted([
+        (late.id, 'deadlock detected'), (later.id, ''),
+    ])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('scope', ['neither', 'both'])
+def test_policies_need_exactly_one_of_franchise_and_batch(scope):
+    batch = create_batch()
+    franchise, policy_batch = (None, None) if scope == 'neither' else (batch.franchise, batch)
+    with pytest.raises(IntegrityError):
+        EnforcementPolicy.objects.create(franchise=franchise, batch=policy_batch, unenroll_after_days=7)
+
+
+@pytest.mark.django_db
+def test_a_franchise_has_one_policy_besides_those_of_its_batches():
+    batch = create_batch()
+    other_batch = create_batch('B2', course=create_course('course-v1:Org+Other+Run'), franchise=batch.franchise)
+    EnforcementPolicy.objects.create(franchise=batch.franchise, unenroll_after_days=7)
+    EnforcementPolicy.objects.create(batch=batch, unenroll_after_days=30)
+    EnforcementPolicy.objects.create(batch=other_batch, unenroll_after_days=30)
+
+    with pytest.raises(IntegrityError):
+        EnforcementPolicy.objects.create(franchise=batch.franchise, unenroll_after_days=14, is_active=False)
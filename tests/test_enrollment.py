@@ -0,0 +1,93 @@
+"""
+Tests for the `application` enrollment module.
+"""
+
+import pytest
+from common.djangoapps.student.models import CourseEnrollment
+from django.contrib.auth.models import User
+
+from application.enrollment import (
+    active_enrollments,
+    enroll_users_in_batch,
+    process_enrollment_job_chunk,
+    queue_enrollment_job,
+    run_enrollment_jobs,
+)
+from application.models import EnrollmentJob, Installment, StudentFeeManagement, UserFranchise
+from test_utils.factories import create_batch, create_student
+
+
+@pytest.mark.django_db
+def test_enroll_users_in_batch_creates_memberships_fees_and_schedules():
+    batch = create_batch()
+    existing = create_student(batch, username='existing')
+    users = [User.objects.create_user(f'new{i}') for i in range(3)]
+
+    enrolled, already_enrolled = enroll_users_in_batch(
+        [user.id for user in users] + [existing.user_id], batch.franchise, batch
+    )
+
+    assert enrolled == users
+    assert already_enrolled == [existing.user]
+    assert UserFranchise.objects.filter(batch=batch).count() == 4
+    student_fees = StudentFeeManagement.objects.filter(user_franchise__user__in=users)
+    assert [fee.remaining_amount for fee in student_fees] == [900] * 3
+    assert Installment.objects.filter(student_fee_management__in=student_fees).count() == 6
+    assert all(CourseEnrollment.is_enrolled(user, batch.course_id) for user in users)
+
+
+@pytest.mark.django_db
+def test_enroll_users_in_batch_skips_members():
+    batch = create_batch()
+    existing = create_student(batch, username='existing')
+
+    assert enroll_users_in_batch([existing.user_id], batch.franchise, batch) == ([], [existing.user])
+
+
+@pytest.mark.django_db
+def test_active_enrollments_resolves_many_students_in_one_query(django_assert_num_queries):
+    batch = create_batch()
+    enrolled = create_student(batch, username='enrolled')
+    unenrolled = create_student(batch, username='unenrolled')
+    CourseEnrollment.unenroll(unenrolled.user, batch.course_id)
+    pairs = [(enrolled.user_id, batch.course_id), (unenrolled.user_id, batch.course_id), (enrolled.user_id, None)]
+
+    with django_assert_num_queries(1):
+        assert active_enrollments(pairs) == {(enrolled.user_id, batch.course_id)}
+    with django_assert_num_queries(0):
+        assert active_enrollments([(enrolled.user_id, None)]) == set()
+
+
+@pytest.mark.django_db
+def test_enrollment_jobs_unenroll_and_reenroll_in_chunks():
+    batch = create_batch()
+    students = [create_student(batch, username=f'student{i}') for i in range(3)]
+    job = queue_enrollment_job('unenroll', [student.id for student in students] * 2)
+    assert job.total == 3
+
+    assert process_enrollment_job_chunk(chunk_size=2) == 2
+    job.refresh_from_db()
+    assert (job.status, job.processed, job.changed) == ('running', 2, 2)
+    assert run_enrollment_jobs(chunk_size=2) == 1
+    job.refresh_from_db()
+    assert (job.status, job.processed, job.changed, job.failed) == ('done', 3, 3, 0)
+    assert not any(CourseEnrollment.is_enrolled(student.user, batch.course_id) for student in students)
+
+    queue_enrollment_job('enroll', [students[0].id])
+    assert run_enrollment_jobs() == 1
+    assert CourseEnrollment.is_enrolled(students[0].user, batch.course_id)
+
+
+@pytest.mark.django_db
+def test_enrollment_job_finishes_when_memberships_are_deleted():
+    batch = create_batch()
+    students = [create_student(batch, username=f'student{i}') for i in range(3)]
+    job = queue_enrollment_job('unenroll', [student.id for student in students])
+    students[2].delete()
+
+    assert process_enrollment_job_chunk(chunk_size=2) == 2
+    # The job is done although its processed count never reaches its total
+    assert process_enrollment_job_chunk(chunk_size=2) is None
+    job.refresh_from_db()
+    assert (job.status, job.processed, job.total) == ('done', 2, 3)
+    assert EnrollmentJob.objects.filter(status__in=['pending', 'running']).count() == 0
@@ -0,0 +1,102 @@
+"""
+Tests for the `application` fees module.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from application.fees import (
+    apply_batch_replan,
+    build_installment_schedules,
+    create_installment_schedules,
+    mark_overdue_installments,
+    plan_batch_replan,
+    reschedule_installments,
+)
+from application.models import Installment, InstallmentTemplate
+from test_utils.factories import create_batch, create_student
+
+
+@pytest.mark.django_db
+def test_overdue_sweep_marks_past_due_and_restores_rescheduled():
+    student = create_student(create_batch(), registered_days_ago=40)
+    first, second = student.fee_management.installments.order_by('due_date')
+    today = first.due_date + timedelta(days=1)
+
+    assert mark_overdue_installments(today=today, chunk_size=1) == (1, 0)
+    assert Installment.objects.get(pk=first.pk).status == 'overdue'
+    assert Installment.objects.get(pk=second.pk).status == 'pending'
+
+    # A second run changes nothing
+    assert mark_overdue_installments(today=today) == (0, 0)
+
+    Installment.objects.filter(pk=first.pk).update(due_date=today + timedelta(days=10))
+    assert mark_overdue_installments(today=today) == (0, 1)
+    assert Installment.objects.get(pk=first.pk).status == 'pending'
+
+
+@pytest.mark.django_db
+def test_schedules_start_overdue_when_already_past_due():
+    batch = create_batch()
+    student_fee = create_student(batch).fee_management
+    templates = list(batch.fee_management.installment_templates.order_by('id'))
+    today = date(2024, 3, 15)
+
+    installments = build_installment_schedules(templates, [(student_fee, date(2024, 1, 20))], today=today)
+
+    assert [i.due_date for i in installments] == [date(2024, 2, 19), date(2024, 3, 20)]
+    assert [i.status for i in installments] == ['overdue', 'pending']
+
+
+@pytest.mark.django_db
+def test_create_installment_schedules_for_many_students():
+    batch = create_batch()
+    student_fees = [create_student(batch, username=f'student{i}').fee_management for i in range(3)]
+    Installment.objects.all().delete()
+    templates = batch.fee_management.installment_templates.order_by('id')
+    registered = date(2024, 1, 1)
+
+    create_installment_schedules(templates, [(student_fee, registered) for student_fee in student_fees])
+
+    for student_fee in student_fees:
+        assert list(student_fee.installments.order_by('due_date').values_list('due_date', 'amount')) == [
+            (date(2024, 1, 31), 450), (date(2024, 3, 1), 450)
+        ]
+
+
+@pytest.mark.django_db
+def test_reschedule_installments_from_registration_date():
+    student_fee = create_student(create_batch()).fee_management
+
+    reschedule_installments(student_fee.installments.order_by('due_date'), date(2024, 5, 1))
+
+    assert list(student_fee.installments.order_by('due_date').values_list('due_date', flat=True)) == [
+        date(2024, 5, 31), date(2024, 6, 30)
+    ]
+
+
+@pytest.mark.django_db
+def test_batch_replan_keeps_paid_installments_and_replaces_the_rest():
+    batch = create_batch()
+    student_fee = create_student(batch).fee_management
+    paid, unpaid = student_fee.installments.order_by('due_date')
+    Installment.objects.filter(pk=paid.pk).update(status='paid', payed_amount=450)
+    fee_management = batch.fee_management
+    fee_management.installment_templates.all().delete()
+    for _ in range(3):
+        InstallmentTemplate.objects.create(batch_fee_management=fee_management, amount=300, repayment_period_days=30)
+    today = date.today()
+
+    [plan] = plan_batch_replan(batch, today=today)
+    assert [i.pk for i in plan['kept']] == [paid.pk]
+    assert [i.pk for i in plan['removed']] == [unpaid.pk]
+    assert [(i.due_date, i.amount) for i in plan['added']] == [
+        (today + timedelta(days=60), 300), (today + timedelta(days=90), 300)
+    ]
+
+    assert apply_batch_replan([plan]) == 1
+    assert list(student_fee.installments.order_by('due_date').values_list('amount', flat=True)) == [450, 300, 300]
+
+    # Re-planning again changes nothing
+    assert apply_batch_replan(plan_batch_replan(batch, today=today)) == 0
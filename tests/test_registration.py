@@ -0,0 +1,75 @@
+"""
+Tests for the `application` registration module.
+"""
+
+import io
+
+import pytest
+from django.contrib.auth.models import User
+
+from application import registration
+from application.models import OutgoingEmail, UserFranchise
+from application.registration import hash_passwords, import_students, parse_student_csv
+from test_utils.factories import create_batch
+
+CSV = (
+    "full_name,email,phone,password,mailing_address\n"
+    "Asha Rao,asha@example.com,9876543210,secret-1,1 Road\n"
+    "Ravi Kumar,ravi@example.com,9876543211,secret-2,2 Road\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def serial_hashing(settings):
+    settings.APPLICATION_IMPORT_HASH_WORKERS = 1
+
+
+@pytest.mark.django_db
+def test_import_students_registers_enrolls_and_queues_emails():
+    batch = create_batch()
+
+    created, errors = import_students(parse_student_csv(io.StringIO(CSV)), batch.franchise, batch)
+
+    assert errors == {}
+    prefix = f"AT-{batch.franchise_id:03d}-001-"
+    assert [user.username for user in created] == [f"{prefix}0001", f"{prefix}0002"]
+    asha = User.objects.get(email='asha@example.com')
+    assert asha.check_password('secret-1')
+    assert asha.profile.phone_number == '9876543210'
+    assert UserFranchise.objects.filter(batch=batch).count() == 2
+    assert OutgoingEmail.objects.filter(to='ravi@example.com', status='pending').count() == 2
+
+
+@pytest.mark.django_db
+def test_import_students_writes_nothing_when_a_row_is_invalid():
+    batch = create_batch()
+    rows = parse_student_csv(io.StringIO(CSV + "No Email,,9876543212,secret-3,3 Road\n"))
+
+    created, errors = import_students(rows, batch.franchise, batch)
+
+    assert created == []
+    assert list(errors) == [3]
+    assert not User.objects.exists()
+
+
+def test_parse_student_csv_requires_all_columns():
+    with pytest.raises(ValueError):
+        parse_student_csv(io.StringIO("full_name,email\nAsha,asha@example.com\n"))
+
+
+def test_hash_pool_is_shared_and_bounded(settings, monkeypatch):
+    settings.APPLICATION_IMPORT_HASH_WORKERS = None
+    monkeypatch.setattr(registration, '_hash_pool', None)
+    monkeypatch.setattr(registration.os, 'cpu_count', lambda: 64)
+
+    pool = registration._get_hash_pool()  # pylint: disable=protected-access
+    try:
+        assert registration._get_hash_pool() is pool  # pylint: disable=protected-access
+        assert pool._max_workers == registration.MAX_HASH_WORKERS  # pylint: disable=protected-access
+    finally:
+        pool.shutdown()
+
+
+def test_hash_passwords_serially_with_one_worker():
+    hashes = hash_passwords(['one', 'two'])
+    assert [hashed.startswith('md5$') for hashed in hashes] == [True, True]
@@ -0,0 +1,41 @@
+"""
+Tests for the `application` reminders module.
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from application.models import FeeReminder, Installment, OutgoingEmail
+from application.reminders import queue_fee_reminders
+from test_utils.factories import create_batch, create_student
+
+
+@pytest.mark.django_db
+def test_queue_fee_reminders_sends_one_email_per_student_once():
+    batch = create_batch()
+    student = create_student(batch, registered_days_ago=40)
+    create_student(batch, username='other', registered_days_ago=0)
+    overdue, upcoming = student.fee_management.installments.order_by('due_date')
+    Installment.objects.filter(pk=overdue.pk).update(status='overdue')
+    today = upcoming.due_date - timedelta(days=2)
+
+    assert queue_fee_reminders(today=today) == (1, 2)
+    email = OutgoingEmail.objects.get()
+    assert email.to == student.user.email
+    assert set(FeeReminder.objects.values_list('installment_id', 'kind')) == {
+        (overdue.pk, 'overdue'), (upcoming.pk, 'upcoming')
+    }
+
+    # Reminders already queued are not repeated
+    assert queue_fee_reminders(today=today) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_queue_fee_reminders_is_limited_to_the_given_batches():
+    batch = create_batch()
+    student = create_student(batch)
+    student.fee_management.installments.update(status='overdue')
+
+    assert queue_fee_reminders(batches=[]) == (0, 0)
+    assert queue_fee_reminders(batches=[batch]) == (1, 2)
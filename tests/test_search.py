@@ -0,0 +1,128 @@
+"""
+Tests for the `application` search module.
+"""
+
+from importlib import import_module
+
+import pytest
+from django.apps import apps
+
+from application.models import PhoneIndex, StudentSearchIndex
+from application.search import (
+    exact_match_students,
+    phone_match_user_ids,
+    refresh_phone_index,
+    refresh_search_index,
+    search_students,
+)
+from test_utils.factories import create_batch, create_student
+
+
+def usernames(rows):
+    return sorted(row.user.username for row in rows)
+
+
+@pytest.fixture
+def students(django_capture_on_commit_callbacks):
+    batch = create_batch()
+    with django_capture_on_commit_callbacks(execute=True):
+        return [
+            create_student(batch, username='asha', phone='+91 98765 43210'),
+            create_student(batch, username='ravi', phone='98765 11111'),
+        ]
+
+
+@pytest.mark.django_db
+def test_search_index_follows_student_changes(students, django_capture_on_commit_callbacks):
+    asha = students[0]
+    row = StudentSearchIndex.objects.get(user=asha.user)
+    assert (row.name, row.email, row.batch_id) == ('asha student', 'asha@example.com', asha.batch_id)
+    assert row.registration_number == asha.registration_number.lower()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        asha.user.first_name = 'Anita'
+        asha.user.save()
+    assert StudentSearchIndex.objects.get(user=asha.user).name == 'anita student'
+
+
+@pytest.mark.django_db
+def test_search_students_by_prefix(students):
+    assert usernames(search_students('Asha St')) == ['asha']
+    assert usernames(search_students('student')) == ['asha', 'ravi']
+    assert usernames(search_students('ravi@')) == ['ravi']
+    assert usernames(search_students(students[0].registration_number[:8])) == ['asha', 'ravi']
+    assert usernames(search_students('nobody')) == []
+    assert usernames(search_students('   ')) == []
+
+
+@pytest.mark.django_db
+def test_search_students_by_phone_prefix(students):
+    assert usernames(search_students('9198')) == ['asha']
+    assert usernames(search_students('98765')) == ['ravi']
+
+
+@pytest.mark.django_db
+def test_complete_identifiers_are_matched_exactly(students):
+    asha, ravi = students
+    assert usernames(exact_match_students('ASHA@example.com')) == ['asha']
+    assert usernames(exact_match_students(ravi.registration_number)) == ['ravi']
+    assert usernames(exact_match_students('9876511111')) == ['ravi']
+    assert usernames(search_students(asha.registration_number)) == ['asha']
+
+
+@pytest.mark.django_db
+def test_partial_or_unknown_identifiers_fall_back_to_prefix_search(students):
+    assert exact_match_students('asha') is None
+    assert exact_match_students('nobody@example.com') is None
+    assert exact_match_students('98765') is None
+    assert usernames(search_students('asha@example')) == ['asha']
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('exact', [True, False])
+def test_phone_queries_match_with_or_without_country_code(students, exact):
+    asha, ravi = students
+    assert sorted(phone_match_user_ids('+91 98765 11111', exact=exact).values_list('user_id', flat=True)) == [
+        ravi.user_id
+    ]
+    assert sorted(phone_match_user_ids('98765 43210', exact=exact).values_list('user_id', flat=True)) == [
+        asha.user_id
+    ]
+
+
+@pytest.mark.django_db
+def test_exact_phone_match_needs_a_whole_number(students):
+    assert not phone_match_user_ids('+91 8765 11111', exact=True).exists()
+    assert not phone_match_user_ids('5 11111', exact=True).exists()
+
+
+@pytest.mark.django_db
+def test_backfill_migration_matches_the_live_index(students):
+    create_student(students[0].batch, username='no_phone', phone='')
+    user_ids = [student.user_id for student in students]
+    fields = ('user_id', 'user_franchise_id', 'franchise_id', 'batch_id', 'name', 'last_name', 'email', 'username',
+              'phone', 'registration_number')
+    refresh_search_index(user_ids)
+    live = sorted(StudentSearchIndex.objects.values_list(*fields))
+    StudentSearchIndex.objects.all().delete()
+
+    migration = import_module('application.migrations.0012_backfill_studentsearchindex')
+    migration.backfill_student_search_index(apps, None)
+
+    backfilled = sorted(StudentSearchIndex.objects.filter(user_id__in=user_ids).values_list(*fields))
+    assert backfilled == live
+    assert StudentSearchIndex.objects.filter(user__username='no_phone', phone='').exists()
+
+
+@pytest.mark.django_db
+def test_phone_backfill_migration_matches_the_live_index(students):
+    user_ids = [student.user_id for student in students]
+    refresh_phone_index(user_ids)
+    live = sorted(PhoneIndex.objects.values_list('user_id', 'digits', 'is_full'))
+    PhoneIndex.objects.all().delete()
+
+    migration = import_module('application.migrations.0013_backfill_phoneindex')
+    migration.backfill_phone_index(apps, None)
+
+    assert sorted(PhoneIndex.objects.values_list('user_id', 'digits', 'is_full')) == live
+    assert list(phone_match_user_ids('9876511111').values_list('user_id', flat=True)) == [students[1].user_id]
@@ -0,0 +1,91 @@
+"""
+Tests for the `application` typeahead module.
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from application import typeahead
+from application.caching import bump_version
+from application.models import StudentSearchIndex
+from application.search import refresh_search_index
+from application.typeahead import get_typeahead_index, typeahead_search
+from test_utils.factories import create_batch, create_student
+
+
+@pytest.fixture(autouse=True)
+def fresh_index(monkeypatch):
+    monkeypatch.setattr(typeahead, '_index', None)
+
+
+@pytest.mark.django_db
+def test_typeahead_ranks_by_trigram_similarity():
+    batch = create_batch()
+    asha = create_student(batch, username='asha', phone='9876543210')
+    ashok = create_student(batch, username='ashok', phone='9123456789')
+    refresh_search_index([asha.user_id, ashok.user_id])
+
+    assert typeahead_search('asha')[0] == asha.id
+    assert typeahead_search('ashok') == [ashok.id]
+    assert typeahead_search('43210') == [asha.id]
+    assert typeahead_search('zzz') == []
+
+
+@pytest.mark.django_db
+def test_incremental_reload_picks_up_rows_committed_after_the_watermark():
+    batch = create_batch()
+    asha = create_student(batch, username='asha')
+    refresh_search_index([asha.user_id])
+    index = get_typeahead_index()
+
+    # A row stamped before the watermark whose transaction only commits now
+    late = create_student(batch, username='ravi')
+    refresh_search_index([late.user_id])
+    StudentSearchIndex.objects.filter(user_id=late.user_id).update(updated_at=index.watermark - timedelta(minutes=1))
+    bump_version('student_search')
+
+    refreshed = get_typeahead_index()
+    assert refreshed.built_at == index.built_at
+    assert typeahead_search('ravi') == [late.id]
+    # Students re-read through the overlap are not indexed twice
+    assert sorted(refreshed.entries) == sorted([asha.id, late.id])
+    assert refreshed.user_entries[asha.user_id] == {asha.id}
+
+
+@pytest.mark.django_db
+def test_incremental_reload_leaves_the_published_index_untouched():
+    batch = create_batch()
+    asha = create_student(batch, username='asha')
+    refresh_search_index([asha.user_id])
+    index = get_typeahead_index()
+
+    ravi = create_student(batch, username='ravi')
+    refresh_search_index([ravi.user_id])
+    StudentSearchIndex.objects.filter(user_id=asha.user_id).delete()
+
+    refreshed = get_typeahead_index()
+    assert refreshed is not index
+    assert refreshed.search('ravi') == [ravi.id]
+    # Searches still running on the old index see it as it was
+    assert index.search('ravi') == []
+    assert index.search('asha') == [asha.id]
+    assert sorted(index.entries) == [asha.id]
+
+
+@pytest.mark.django_db
+def test_incremental_reload_drops_deleted_memberships():
+    batch = create_batch()
+    asha = create_student(batch, username='asha')
+    ravi = create_student(batch, username='ravi')
+    refresh_search_index([asha.user_id, ravi.user_id])
+    assert typeahead_search('ravi') == [ravi.id]
+
+    # Deleting a user cascades to their rows without writing any new one
+    ravi.user.delete()
+    bump_version('student_search')
+
+    index = get_typeahead_index()
+    assert typeahead_search('ravi') == []
+    assert sorted(index.entries) == [asha.id]
+    assert ravi.user_id not in index.user_entries
@@ -0,0 +1,244 @@
+"""
+Tests for the `application` views module.
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.core import signing
+from django.utils import timezone
+
+from application.enrollment import queue_enrollment_job
+from application.models import CourseFee, EnrollmentJob, Franchise, Installment
+from application.search import refresh_phone_index
+from application.views import make_payment_token, read_payment_token
+from test_utils.factories import create_batch, create_course, create_franchise, create_staff_user, create_student
+
+
+def test_payment_token_round_trip():
+    details = read_payment_token(make_payment_token(7, '450.00', [3, 4]))
+    assert details['user_franchise_id'] == 7
+    assert details['amount'] == 450.0
+    assert details['installments'] == [3, 4]
+
+
+@pytest.mark.parametrize('token', [None, '', 'not-a-token'])
+def test_payment_token_rejects_missing_and_forged_tokens(token):
+    assert read_payment_token(token) is None
+
+
+def test_payment_token_expires():
+    token = make_payment_token(7, '450.00', [3])
+    with mock.patch('django.core.signing.time.time', return_value=signing.time.time() + 2 * 24 * 60 * 60):
+        assert read_payment_token(token) is None
+
+
+@pytest.mark.django_db
+def test_franchise_list_ranks_matches_first_and_paginates(admin_client):
+    for name in ['Pune East', 'Delhi', 'North Delhi'] + [f'Other {i}' for i in range(20)]:
+        create_franchise(name)
+    Franchise.objects.filter(name='Other 5').update(location='Delhi')
+
+    data = admin_client.get('/franchises/', {'search': 'delhi', 'format': 'json'}).json()
+
+    assert (data['count'], data['num_pages']) == (23, 2)
+    assert [row['name'] for row in data['results'][:3]] == ['Delhi', 'North Delhi', 'Other 5']
+    assert [row['matches'] for row in data['results'][:4]] == [True, True, True, False]
+
+    last_page = admin_client.get('/franchises/', {'page': '99', 'format': 'json'}).json()
+    assert (last_page['page'], len(last_page['results'])) == (2, 3)
+
+
+@pytest.mark.django_db
+def test_batch_students_fee_status_and_search(admin_client):
+    batch = create_batch()
+    students = {
+        name: create_student(batch, username=name, phone=phone, registered_days_ago=0)
+        for name, phone in [('overdue', '9000000001'), ('paid', '9000000002'), ('partial', '9111111111'),
+                            ('pending', '9000000004')]
+    }
+
+    def installments(name):
+        return Installment.objects.filter(student_fee_management__user_franchise=students[name])
+
+    installments('overdue').update(status='overdue')
+    installments('paid').update(status='paid', payed_amount=450)
+    installments('partial').update(payed_amount=100)
+    refresh_phone_index([student.user_id for student in students.values()])
+    url = f'/franchise/{batch.franchise_id}/batch/{batch.id}/students/'
+
+    page = admin_client.get(url).context['students']
+    assert {student.user.username: student.fee_status for student in page} == {
+        'overdue': 'overdue', 'paid': 'paid', 'partial': 'partial', 'pending': 'pending'
+    }
+
+    # Matches come first, then the rest of the batch
+    page = admin_client.get(url, {'search': 'partial'}).context['students']
+    assert [student.user.username for student in page][:1] == ['partial']
+    assert len(page) == 4
+    page = admin_client.get(url, {'search': '91111'}).context['students']
+    assert page[0].user.username == 'partial'
+    page = admin_client.get(url, {'search': students['pending'].registration_number}).context['students']
+    assert page[0].user.username == 'pending'
+
+
+@pytest.mark.django_db
+def test_franchise_report_counts_students_per_course_and_pages_students(admin_client):
+    batch = create_batch()
+    for i in range(52):
+        create_student(batch, username=f'student{i:02d}')
+
+    response = admin_client.get(f'/franchise/{batch.franchise_id}/report/')
+    assert [(course.id, course.student_count) for course in response.context['courses']] == [(batch.course_id, 52)]
+
+    data = admin_client.get(f'/franchise/{batch.franchise_id}/students/').json()
+    assert (len(data['results']), data['has_next'], data['count']) == (50, True, 52)
+    assert data['results'][0]['username'] == 'student00'
+    data = admin_client.get(f'/franchise/{batch.franchise_id}/students/', {'page': 2}).json()
+    assert (len(data['results']), data['has_next'], data['page']) == (2, False, 2)
+
+
+@pytest.mark.django_db
+def test_fee_reminders_lists_overdue_students_with_their_enrollment_status(admin_client):
+    batch = create_batch()
+    enrolled = create_student(batch, username='enrolled')
+    unenrolled = create_student(batch, username='unenrolled', enroll=False)
+    Installment.objects.filter(due_date__lt=date.today()).update(status='overdue')
+
+    overdue = admin_client.get('/fee-reminders/').context['overdue_data']
+
+    assert {
+        row['installment'].student_fee_management.user_franchise_id: row['is_enrolled'] for row in overdue
+    } == {enrolled.id: True, unenrolled.id: False}
+
+
+@pytest.mark.django_db
+def test_bulk_unenroll_is_limited_to_the_users_batches(client):
+    batch = create_batch()
+    other_batch = create_batch('B2', course=create_course('course-v1:Org+Other+Run'), franchise=batch.franchise)
+    student = create_student(batch, username='student')
+    create_student(other_batch, username='other')
+    Installment.objects.filter(due_date__lt=date.today()).update(status='overdue')
+    client.force_login(create_staff_user(batches=[batch]))
+
+    response = client.post('/fee-reminders/', {
+        'action': 'bulk_unenroll',
+        'installment_ids': list(Installment.objects.filter(status='overdue').values_list('id', flat=True)),
+    })
+
+    job = EnrollmentJob.objects.get()
+    assert response.status_code == 302
+    assert list(job.items.values_list('user_franchise_id', flat=True)) == [student.id]
+
+
+@pytest.mark.django_db
+def test_bulk_unenroll_ignores_malformed_ids(admin_client):
+    response = admin_client.post('/fee-reminders/', {'action': 'bulk_unenroll', 'installment_ids': ['1x', '']})
+
+    assert response.status_code == 302
+    assert not EnrollmentJob.objects.exists()
+
+
+@pytest.mark.django_db
+def test_enrollment_job_status_is_limited_to_the_jobs_creator(client):
+    owner = create_staff_user('owner')
+    job = queue_enrollment_job('unenroll', [], created_by=owner)
+
+    client.force_login(create_staff_user('someone_else'))
+    assert client.get(f'/fee-reminders/jobs/{job.id}/').status_code == 404
+
+    client.force_login(owner)
+    assert client.get(f'/fee-reminders/jobs/{job.id}/').json()['status'] == 'pending'
+
+
+@pytest.mark.django_db
+def test_inactive_users_filters_by_days_since_last_login(admin_client):
+    batch = create_batch()
+    now = timezone.now()
+    logins = {'never': None, 'long_ago': now - timedelta(days=10), 'recent': now - timedelta(hours=1)}
+    for username, last_login in logins.items():
+        student = create_student(batch, username=username)
+        student.user.last_login = last_login
+        student.user.save()
+
+    rows = admin_client.get('/inactive-users/', {'days_min': '5'}).context['user_data']
+    assert {row['user'].username: row['days_inactive'] for row in rows} == {'never': None, 'long_ago': 10}
+    assert {row['batch'] for row in rows} == {batch}
+
+    rows = admin_client.get('/inactive-users/', {'days_min': 'x'}).context['user_data']
+    assert len(rows) == 2
+    assert len(admin_client.get('/inactive-users/', {'days_min': '0'}).context['user_data']) == 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('value', ['NaN', 'Infinity', '-5', '100000000', '1e30', 'abc'])
+def test_course_fee_list_rejects_invalid_fees(admin_client, value):
+    course = create_course()
+    CourseFee.objects.create(course=course, fee=100)
+
+    admin_client.post('/course/', {f'fee_{course.id}': value})
+
+    assert CourseFee.objects.get(course=course).fee == 100
+
+
+@pytest.mark.django_db
+def test_course_fee_list_saves_new_and_changed_fees(admin_client):
+    priced = create_course('course-v1:Org+Priced+Run')
+    CourseFee.objects.create(course=priced, fee=100)
+    unpriced = create_course('course-v1:Org+Unpriced+Run')
+
+    admin_client.post('/course/', {f'fee_{priced.id}': '99999999.994', f'fee_{unpriced.id}': '250.5'})
+
+    assert CourseFee.objects.get(course=priced).fee == Decimal('99999999.99')
+    assert CourseFee.objects.get(course=unpriced).fee == Decimal('250.50')
+
+
+@pytest.mark.django_db
+def test_batch_lookups_answer_304_until_batch_data_changes(admin_client, django_capture_on_commit_callbacks):
+    batch = create_batch()
+    url = f'/get-batches/{batch.franchise_id}/'
+
+    response = admin_client.get(url)
+    assert response.json() == {'batches': [{'id': batch.id, 'batch_no': 'B1'}]}
+    etag = response['ETag']
+    assert admin_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        create_batch('B2', course=create_course('course-v1:Org+Other+Run'), franchise=batch.franchise)
+        # Not invalidated before the transaction commits
+        assert admin_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    for callback in callbacks:
+        callback()
+
+    response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert [row['batch_no'] for row in response.json()['batches']] == ['B1', 'B2']
+
+
+@pytest.mark.django_db
+def test_installment_editor_balances_against_the_net_payable_of_a_part_paid_student(admin_client):
+    batch = create_batch(fees=1000, discount=100, installments=(450, 450))
+    student = create_student(batch)
+    first, second = student.fee_management.installments.order_by('due_date')
+    Installment.objects.filter(pk=first.pk).update(status='paid', payed_amount=450)
+    student.fee_management.save()
+    assert student.fee_management.remaining_amount == 450
+    url = f'/franchise/{batch.franchise_id}/batch/{batch.id}/student-fee-management/{student.user_id}/edit-installment/'
+
+    response = admin_client.get(url)
+    assert (response.context['net_payable'], response.context['amount_to_add']) == (900, 0)
+    assert "parseFloat('900" in response.content.decode()
+
+    response = admin_client.post(url, {
+        'form-TOTAL_FORMS': '2', 'form-INITIAL_FORMS': '2',
+        'form-0-id': first.pk, 'form-0-amount': '450', 'form-0-repayment_period_days': '30',
+        'form-1-id': second.pk, 'form-1-amount': '450', 'form-1-repayment_period_days': '45',
+    })
+    assert response.status_code == 302
+    assert Installment.objects.get(pk=second.pk).repayment_period_days == 45
+    assert admin_client.get(url).context['amount_to_add'] == 0
+
+    detail = admin_client.get(f'/franchise/{batch.franchise_id}/batch/{batch.id}/student/{student.user_id}/')
+    assert detail.context['net_payable'] == 900